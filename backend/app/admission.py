@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import hashlib
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Iterator
+
+from .config import settings
+from .http import Request, Response, error_response
+
+MAX_TRACKED_KEYS = 10_000
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    requests: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.seconds
+
+
+def parse_rate(value: str) -> RateLimit:
+    requests, _, seconds = value.partition("/")
+    limit = RateLimit(requests=int(requests), seconds=float(seconds or 60))
+    if limit.requests <= 0 or limit.seconds <= 0:
+        raise ValueError(f"Invalid rate limit: {value}")
+    return limit
+
+
+def parse_route_limits(items: tuple[str, ...]) -> dict[tuple[str, str], RateLimit]:
+    limits: dict[tuple[str, str], RateLimit] = {}
+    for item in items:
+        route, _, rate = item.rpartition("=")
+        method, _, pattern = route.strip().partition(" ")
+        limits[(method.upper(), pattern.strip())] = parse_rate(rate.strip())
+    return limits
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, limit: RateLimit, now: float):
+        self.capacity = float(limit.requests)
+        self.rate = limit.rate
+        self.tokens = self.capacity
+        # The caller's clock reading, so the first take never sees time run backwards and come up short.
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        # Returns 0 when a token was consumed, otherwise seconds until one is available.
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        # Least recently updated first, so the buckets most likely to have refilled sit at the front.
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= MAX_TRACKED_KEYS:
+                    self._prune(now)
+                bucket = self._buckets[key] = TokenBucket(self.limit, now)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+    def _prune(self, now: float) -> None:
+        # Buckets that have refilled carry no state worth keeping.
+        while self._buckets and next(iter(self._buckets.values())).is_full(now):
+            self._buckets.popitem(last=False)
+        # With every key still active, forget the least recently seen ones rather than grow without bound.
+        while len(self._buckets) >= MAX_TRACKED_KEYS:
+            self._buckets.popitem(last=False)
+
+
+class ConcurrencyGate:
+    def __init__(self, max_active: int, max_waiting: int, wait_timeout: float):
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_active)
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def admit(self) -> Iterator[bool]:
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                queue_full = self._waiting >= self.max_waiting
+                if not queue_full:
+                    self._waiting += 1
+            if not queue_full:
+                try:
+                    acquired = self._slots.acquire(timeout=self.wait_timeout)
+                finally:
+                    with self._lock:
+                        self._waiting -= 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._slots.release()
+
+
+def _client_keys(request: Request) -> tuple[str | None, str]:
+    header = request.headers.get("Authorization") or ""
+    token_key = None
+    if header.startswith("Bearer "):
+        # Keyed on a digest so raw tokens are never held in limiter state.
+        token_key = hashlib.sha256(header[7:].encode("utf-8")).hexdigest()
+    return token_key, client_address(request)
+
+
+def parse_networks(items: tuple[str, ...]) -> tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, ...]:
+    return tuple(ipaddress.ip_network(item, strict=False) for item in items)
+
+
+def _is_trusted(address: str) -> bool:
+    if not trusted_proxies:
+        return False
+    try:
+        parsed = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(parsed in network for network in trusted_proxies)
+
+
+def client_address(request: Request) -> str:
+    """REMOTE_ADDR, or the nearest untrusted hop in X-Forwarded-For when the request came through a trusted proxy."""
+    address = request.environ.get("REMOTE_ADDR") or "unknown"
+    if not _is_trusted(address):
+        return address
+    forwarded = request.headers.get("X-Forwarded-For") or ""
+    # Proxies append, so read from the right; anything left of the first untrusted hop is client-supplied.
+    for hop in reversed([item.strip() for item in forwarded.split(",") if item.strip()]):
+        if not _is_trusted(hop):
+            return hop
+        address = hop
+    return address
+
+
+def _too_many(retry_after: float) -> Response:
+    response = error_response("Too many requests", HTTPStatus.TOO_MANY_REQUESTS)
+    response.headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+    return response
+
+
+trusted_proxies = parse_networks(settings.trusted_proxies)
+token_limiter = RateLimiter(parse_rate(settings.rate_limit_per_token))
+address_limiter = RateLimiter(parse_rate(settings.rate_limit_per_address))
+route_limiters = {route: RateLimiter(limit) for route, limit in parse_route_limits(settings.rate_limit_routes).items()}
+gate = ConcurrencyGate(settings.max_concurrent_requests, settings.max_queued_requests, settings.queue_timeout_ms / 1000)
+
+
+def check_rate_limits(request: Request, route: tuple[str, str] | None) -> Response | None:
+    if not settings.rate_limit_enabled:
+        return None
+    token_key, address = _client_keys(request)
+    client_key = token_key or f"addr:{address}"
+    retry_after = address_limiter.take(address)
+    if not retry_after and token_key:
+        retry_after = token_limiter.take(token_key)
+    if not retry_after and route in route_limiters:
+        retry_after = route_limiters[route].take(client_key)
+    if retry_after:
+        return _too_many(retry_after)
+    return None
+
+
+def overloaded() -> Response:
+    response = error_response("Server busy, retry shortly", HTTPStatus.SERVICE_UNAVAILABLE)
+    response.headers = {"Retry-After": str(max(1, math.ceil(settings.queue_timeout_ms / 1000)))}
+    return response
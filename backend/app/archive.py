@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+from .db import ARCHIVE_MIGRATIONS_DIR, ARCHIVE_SCHEMA_VERSION, db, migrate_connection
+from .services.attendance import current_season, season_for
+
+SESSION_COLUMNS = "id, team_id, title, description, location, start_at, end_at, is_locked, auto_lock_minutes, created_by, created_at, updated_at"
+RSVP_COLUMNS = "id, session_id, profile_id, status, note, created_at, updated_at"
+ACTIVITY_COLUMNS = "id, team_id, profile_id, action, entity_type, entity_id, payload, created_at"
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _archive_file(source_path: str, archive_path: str, season: int, team_ids: set[int] | None) -> Counter[str]:
+    archive = sqlite3.connect(archive_path)
+    try:
+        migrate_connection(archive, ARCHIVE_MIGRATIONS_DIR, ARCHIVE_SCHEMA_VERSION)
+    finally:
+        archive.close()
+    connection = sqlite3.connect(source_path, isolation_level=None)
+    try:
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        connection.execute("CREATE TEMP TABLE archived_sessions (id INTEGER PRIMARY KEY)")
+        connection.execute("CREATE TEMP TABLE archived_activity (id INTEGER PRIMARY KEY)")
+        # In WAL mode a transaction over attached files commits each file on its own, so the
+        # copy is committed to the archive first and only then removed from the hot tables.
+        # An interrupted run leaves duplicates rather than gaps, and the re-run finishes it.
+        connection.execute("BEGIN")
+        try:
+            # Seasons are decided in Python: stored start times may carry any UTC offset.
+            session_seasons = {
+                row[0]: season_for(row[2])
+                for schema in ("archive", "main")
+                for row in connection.execute(f"SELECT id, team_id, start_at FROM {schema}.sessions")
+                if team_ids is None or row[1] in team_ids
+            }
+            sessions = [
+                (row[0],)
+                for row in connection.execute("SELECT id, team_id FROM main.sessions")
+                if (team_ids is None or row[1] in team_ids) and session_seasons[row[0]] == season
+            ]
+            # Every activity entry points at a session; it follows that session's season so the two
+            # stay together, and only entries whose session is gone fall back to their own date.
+            activity = [
+                (row[0],)
+                for row in connection.execute("SELECT id, team_id, entity_id, created_at FROM main.activity_logs")
+                if (team_ids is None or row[1] in team_ids) and session_seasons.get(row[2], season_for(row[3])) == season
+            ]
+            connection.executemany("INSERT INTO temp.archived_sessions(id) VALUES (?)", sessions)
+            connection.executemany("INSERT INTO temp.archived_activity(id) VALUES (?)", activity)
+            connection.execute(f"INSERT OR IGNORE INTO archive.sessions({SESSION_COLUMNS}) SELECT {SESSION_COLUMNS} FROM main.sessions WHERE id IN (SELECT id FROM temp.archived_sessions)")
+            connection.execute(f"INSERT OR IGNORE INTO archive.rsvps({RSVP_COLUMNS}) SELECT {RSVP_COLUMNS} FROM main.rsvps WHERE session_id IN (SELECT id FROM temp.archived_sessions)")
+            connection.execute(f"INSERT OR IGNORE INTO archive.activity_logs({ACTIVITY_COLUMNS}) SELECT {ACTIVITY_COLUMNS} FROM main.activity_logs WHERE id IN (SELECT id FROM temp.archived_activity)")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Only rows the archive now holds are removed, and a session goes only once none of its
+            # RSVPs remain, so nothing added since the copy is cascaded away.
+            counts = Counter({
+                "rsvps": connection.execute("DELETE FROM main.rsvps WHERE session_id IN (SELECT id FROM temp.archived_sessions) AND id IN (SELECT id FROM archive.rsvps)").rowcount,
+                "sessions": connection.execute("DELETE FROM main.sessions WHERE id IN (SELECT id FROM temp.archived_sessions) AND id IN (SELECT id FROM archive.sessions) AND NOT EXISTS (SELECT 1 FROM main.rsvps WHERE rsvps.session_id = sessions.id)").rowcount,
+                "activity_logs": connection.execute("DELETE FROM main.activity_logs WHERE id IN (SELECT id FROM temp.archived_activity) AND id IN (SELECT id FROM archive.activity_logs)").rowcount,
+            })
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        # Refresh planner statistics for the now smaller hot tables.
+        connection.execute("PRAGMA main.optimize")
+    finally:
+        connection.close()
+    return counts
+
+
+def archive_season(season: int, team_ids: list[int] | None = None) -> dict[str, int]:
+    if not db.archive_file:
+        raise ArchiveError("DATABASE_ARCHIVE_PATH is not set")
+    if season >= current_season():
+        raise ArchiveError(f"Season {season} is not closed yet")
+    db.migrate()
+    totals: Counter[str] = Counter()
+    if db.shard_dir:
+        for team_id in team_ids or db.shard_team_ids():
+            if Path(db.shard_path(team_id)).exists():
+                totals += _archive_file(db.shard_path(team_id), db.archive_path(team_id), season, {team_id})
+    else:
+        totals += _archive_file(db.path, db.archive_path(), season, set(team_ids) if team_ids else None)
+    return {"season": season, "sessions": totals["sessions"], "rsvps": totals["rsvps"], "activity_logs": totals["activity_logs"]}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Move a closed season's sessions, RSVPs and activity into the archive database")
+    parser.add_argument("--season", type=int, required=True, help="Season to archive, named by the year it starts in")
+    parser.add_argument("--team", type=int, action="append", help="Limit archival to this team (repeatable)")
+    args = parser.parse_args(argv)
+    try:
+        result = archive_season(args.season, args.team)
+    except ArchiveError as exc:
+        print(exc)
+        raise SystemExit(1)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable
+from urllib.parse import unquote
+
+from .config import settings
+from .db import db
+from .http import Request, Response, error_response
+from .server import FILE_BLOCK_SIZE, dispatch, finalize_response, register_routes
+from .services import notifications
+
+logger = logging.getLogger("otj_u8s.asgi")
+
+Scope = dict[str, Any]
+Message = dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+KEEP_ALIVE_SECONDS = 15
+MAX_HEADER_COUNT = 100
+NO_BODY_STATUSES = {HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED}
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+def build_environ(scope: Scope, body: bytes) -> dict[str, Any]:
+    """WSGI-style environ for Request, so handlers see the same object under both servers."""
+    client = scope.get("client") or ("", 0)
+    server = scope.get("server") or ("localhost", 80)
+    environ: dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "CONTENT_LENGTH": str(len(body)),
+        "REMOTE_ADDR": client[0],
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def content_length(value: bytes | None) -> int | None:
+    """Declared body length; None when the header is not a plain non-negative integer."""
+    if value is None:
+        return 0
+    value = value.strip()
+    return int(value) if value.isdigit() else None
+
+
+async def read_body(receive: Receive, limit: int) -> bytes | None:
+    # Chunks arrive as the client sends them; no thread waits on a slow upload.
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body.extend(message.get("body", b""))
+        if len(body) > limit:
+            raise BodyTooLarge()
+        if not message.get("more_body", False):
+            return bytes(body)
+
+
+class ASGIApplication:
+    """Runs the WSGI router and handlers on an event loop, offloading each handler to a bounded pool."""
+
+    def __init__(self, worker_threads: int | None = None, mail_threads: int | None = None):
+        self.executor = ThreadPoolExecutor(
+            max_workers=worker_threads or settings.asgi_worker_threads, thread_name_prefix="otj-asgi"
+        )
+        self.mail_executor = ThreadPoolExecutor(
+            max_workers=mail_threads or settings.asgi_mail_threads, thread_name_prefix="otj-mail"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await loop.run_in_executor(self.executor, db.migrate)
+                register_routes()
+                notifications.deliver_with(self.mail_executor)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                notifications.deliver_with(None)
+                self.mail_executor.shutdown(wait=True)
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        loop = asyncio.get_running_loop()
+        declared = content_length(dict(scope.get("headers", [])).get(b"content-length"))
+        if declared is None:
+            request = Request(build_environ(scope, b""))
+            await self._respond(request, error_response("Invalid Content-Length"), send)
+            return
+        try:
+            if declared > settings.max_request_body_bytes:
+                raise BodyTooLarge()
+            body = await read_body(receive, settings.max_request_body_bytes)
+        except BodyTooLarge:
+            request = Request(build_environ(scope, b""))
+            await self._respond(request, error_response("Request body too large", HTTPStatus.REQUEST_ENTITY_TOO_LARGE), send)
+            return
+        if body is None:
+            return
+        request = Request(build_environ(scope, body))
+        response = await loop.run_in_executor(self.executor, dispatch, request)
+        await self._respond(request, response, send)
+
+    async def _respond(self, request: Request, response: Response, send: Send) -> None:
+        status_code, headers, body = finalize_response(request, response)
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        })
+        if response.file is None:
+            await send({"type": "http.response.body", "body": body})
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, response.file.read, FILE_BLOCK_SIZE)
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(chunk)})
+                if not chunk:
+                    break
+        finally:
+            response.file.close()
+
+
+app = ASGIApplication()
+
+
+class _Connection:
+    """One HTTP/1.1 connection served with asyncio streams; requests on it are handled in order."""
+
+    def __init__(self, application: Callable[[Scope, Receive, Send], Awaitable[None]], reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.application = application
+        self.reader = reader
+        self.writer = writer
+        self.client = writer.get_extra_info("peername") or ("", 0)
+        self.server = writer.get_extra_info("sockname") or ("", 0)
+
+    async def serve(self) -> None:
+        try:
+            while await self._serve_one():
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self.writer.close()
+
+    async def _read_head(self) -> tuple[str, str, str, list[tuple[bytes, bytes]]] | None:
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), KEEP_ALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            return None
+        if not line.strip():
+            return None
+        method, target, version = line.decode("latin-1").split()
+        headers: list[tuple[bytes, bytes]] = []
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADER_COUNT:
+                raise ValueError("Too many headers")
+            name, _, value = line.partition(b":")
+            headers.append((name.strip().lower(), value.strip()))
+        return method.upper(), target, version, headers
+
+    @staticmethod
+    def _head(state: dict[str, Any], first_body: bytes, more_body: bool, keep_alive: bool) -> bytes:
+        status = state["status"]
+        headers = state["headers"]
+        names = {name.lower() for name, _ in headers}
+        if b"content-length" not in names and status not in NO_BODY_STATUSES:
+            if more_body:
+                # Streamed without a declared length: frame it with chunked encoding.
+                state["chunked"] = True
+                headers.append((b"transfer-encoding", b"chunked"))
+            else:
+                headers.append((b"content-length", str(len(first_body)).encode("latin-1")))
+        if not keep_alive:
+            headers.append((b"connection", b"close"))
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}".encode("latin-1")]
+        lines.extend(name + b": " + value for name, value in headers)
+        return b"\r\n".join(lines) + b"\r\n\r\n"
+
+    async def _serve_one(self) -> bool:
+        head = await self._read_head()
+        if head is None:
+            return False
+        method, target, version, headers = head
+        header_map = {name: value for name, value in headers}
+        connection = header_map.get(b"connection", b"").lower()
+        keep_alive = connection != b"close" if version == "HTTP/1.1" else connection == b"keep-alive"
+        chunked = b"chunked" in header_map.get(b"transfer-encoding", b"").lower()
+        remaining = content_length(header_map.get(b"content-length"))
+        if remaining is None:
+            # Without a usable length the body cannot be framed, so answer and drop the connection.
+            status, response_headers, payload = error_response("Invalid Content-Length").to_wsgi()
+            state = {"status": status, "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response_headers]}
+            self.writer.write(self._head(state, payload, False, keep_alive=False) + payload)
+            await self.writer.drain()
+            return False
+        expect_continue = header_map.get(b"expect", b"").lower() == b"100-continue"
+        body_done = False
+        response_state: dict[str, Any] = {"started": False, "chunked": False}
+        path, _, query = target.partition("?")
+
+        async def receive() -> Message:
+            nonlocal remaining, body_done, expect_continue
+            if body_done:
+                return {"type": "http.disconnect"}
+            if not chunked and remaining == 0:
+                body_done = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            if expect_continue:
+                # The client holds the body back until told to go ahead.
+                self.writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                expect_continue = False
+            if chunked:
+                size = int((await self.reader.readline()).split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    body_done = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                chunk = await self.reader.readexactly(size)
+                await self.reader.readline()
+                return {"type": "http.request", "body": chunk, "more_body": True}
+            chunk = await self.reader.read(min(remaining, FILE_BLOCK_SIZE))
+            if not chunk:
+                raise ConnectionError("Client closed during request body")
+            remaining -= len(chunk)
+            body_done = remaining == 0
+            return {"type": "http.request", "body": chunk, "more_body": not body_done}
+
+        async def send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_state["status"] = int(message["status"])
+                response_state["headers"] = list(message.get("headers", []))
+                return
+            data = message.get("body", b"")
+            more = message.get("more_body", False)
+            if not response_state["started"]:
+                self.writer.write(self._head(response_state, data, more, keep_alive))
+                response_state["started"] = True
+            if response_state["chunked"]:
+                if data:
+                    self.writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+                if not more:
+                    self.writer.write(b"0\r\n\r\n")
+            elif data:
+                self.writer.write(data)
+            await self.writer.drain()
+
+        scope: Scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": version.partition("/")[2] or "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": unquote(path),
+            "raw_path": path.encode("latin-1"),
+            "query_string": query.encode("latin-1"),
+            "root_path": "",
+            "headers": headers,
+            "client": tuple(self.client[:2]),
+            "server": tuple(self.server[:2]),
+        }
+        await self.application(scope, receive, send)
+        # A body the application did not read leaves the stream mid-request; close instead of reusing it.
+        return keep_alive and (body_done or (not chunked and remaining == 0)) and response_state["started"]
+
+
+async def serve(application: ASGIApplication, host: str = "0.0.0.0", port: int = 8000) -> None:
+    lifespan: asyncio.Queue[Message] = asyncio.Queue()
+    sent: asyncio.Queue[Message] = asyncio.Queue()
+    lifespan_task = asyncio.create_task(application({"type": "lifespan"}, lifespan.get, sent.put))
+    await lifespan.put({"type": "lifespan.startup"})
+    await sent.get()
+
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await _Connection(application, reader, writer).serve()
+
+    server = await asyncio.start_server(on_connection, host, port, backlog=1024)
+    logger.info("ASGI server running on port %s", port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await lifespan.put({"type": "lifespan.shutdown"})
+        await sent.get()
+        await lifespan_task
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the API with the stdlib asyncio HTTP server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(app, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
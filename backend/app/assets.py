@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import settings
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # optional: gzip variants are always built
+    brotli = None
+
+FINGERPRINTED_ASSETS = ("app.js", "styles.css")
+INDEX_FILE = "index.html"
+MANIFEST_FILE = "manifest.json"
+STATIC_PREFIX = "static/"
+ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+
+@dataclass
+class Asset:
+    name: str
+    path: Path
+    content_type: str
+    etag: str
+    encodings: dict[str, Path] = field(default_factory=dict)
+
+    def select(self, accept_encoding: str) -> tuple[Path, str | None]:
+        weights = accepted_encodings(accept_encoding)
+        best: tuple[float, str] | None = None
+        for encoding, _ in ENCODING_SUFFIXES:
+            weight = weights.get(encoding, weights.get("*", 0.0))
+            # Ties keep the earlier, smaller encoding; q=0 is a refusal.
+            if weight > 0 and encoding in self.encodings and (best is None or weight > best[0]):
+                best = (weight, encoding)
+        if best is None:
+            return self.path, None
+        return self.encodings[best[1]], best[1]
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Accept-Encoding as {coding: q}; a malformed q counts as 0 so it never forces an encoding on a client."""
+    weights: dict[str, float] = {}
+    for item in header.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_variants(path: Path, data: bytes) -> None:
+    path.write_bytes(data)
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + ".br").write_bytes(brotli.compress(data))
+
+
+def build(source_dir: Path, dist_dir: Path, api_base: str = "/") -> dict[str, str]:
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    (dist_dir / STATIC_PREFIX).mkdir(parents=True)
+    manifest: dict[str, str] = {}
+    for name in FINGERPRINTED_ASSETS:
+        data = (source_dir / name).read_bytes()
+        stem, suffix = name.rsplit(".", 1)
+        fingerprinted = f"{stem}.{_digest(data)[:12]}.{suffix}"
+        _write_variants(dist_dir / STATIC_PREFIX / fingerprinted, data)
+        manifest[name] = fingerprinted
+    index = (source_dir / INDEX_FILE).read_text(encoding="utf-8")
+    for name, fingerprinted in manifest.items():
+        index = re.sub(rf'(href|src)="{re.escape(name)}"', rf'\1="{STATIC_PREFIX}{fingerprinted}"', index)
+    # Served from the API origin, so an empty API base meta tag should mean "same origin".
+    index = index.replace('<meta name="otj-api-base" content="" />', f'<meta name="otj-api-base" content="{api_base}" />')
+    _write_variants(dist_dir / INDEX_FILE, index.encode("utf-8"))
+    (dist_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    return manifest
+
+
+def _load_asset(name: str, path: Path) -> Asset:
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in {"application/javascript", "text/javascript"}:
+        content_type = f"{content_type}; charset=utf-8"
+    encodings = {
+        encoding: path.with_name(path.name + suffix)
+        for encoding, suffix in ENCODING_SUFFIXES
+        if path.with_name(path.name + suffix).exists()
+    }
+    return Asset(name=name, path=path, content_type=content_type, etag=f'"{_digest(path.read_bytes())[:32]}"', encodings=encodings)
+
+
+_assets_lock = threading.Lock()
+_assets: dict[str, Asset] | None = None
+
+
+def load_assets(dist_dir: Path | None = None) -> dict[str, Asset]:
+    global _assets
+    with _assets_lock:
+        if _assets is None:
+            dist_dir = dist_dir or Path(settings.frontend_dist_dir)
+            manifest = json.loads((dist_dir / MANIFEST_FILE).read_text(encoding="utf-8"))
+            assets = {INDEX_FILE: _load_asset(INDEX_FILE, dist_dir / INDEX_FILE)}
+            for fingerprinted in manifest.values():
+                assets[fingerprinted] = _load_asset(fingerprinted, dist_dir / STATIC_PREFIX / fingerprinted)
+            _assets = assets
+        return _assets
+
+
+def main(argv: list[str] | None = None) -> None:
+    repo_root = Path(__file__).resolve().parents[2]
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress the frontend for serving from the API")
+    parser.add_argument("--source", default=str(repo_root / "frontend"), help="Frontend source directory")
+    parser.add_argument("--dist", default=settings.frontend_dist_dir, help="Output directory")
+    parser.add_argument("--api-base", default="/", help="Value written into an empty otj-api-base meta tag")
+    args = parser.parse_args(argv)
+    manifest = build(Path(args.source), Path(args.dist), api_base=args.api_base)
+    compressed = "gzip and brotli" if brotli is not None else "gzip"
+    print(f"Built {len(manifest)} fingerprinted assets ({compressed}) into {args.dist}")
+
+
+if __name__ == "__main__":
+    main()
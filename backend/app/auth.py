@@ -5,7 +5,10 @@ import hashlib
 import hmac
 import json
 import secrets
+import threading
+import time
 from dataclasses import dataclass
+from datetime import timedelta
 from http import HTTPStatus
 from typing import Any
 
@@ -15,9 +18,15 @@ from .http import Request, Response, error_response, json_response
 from .utils.time import format_iso8601, parse_iso8601, utc_now
 
 ALLOWED_ROLES = {"manager", "coach", "player"}
+STATELESS_TOKEN_TYPE = "stateless"
 
+# profile_id -> (auth_version, cached_at); refreshed after AUTH_VERSION_CACHE_SECONDS
+# so bumps made by other processes are picked up.
+_auth_versions_lock = threading.Lock()
+_auth_versions: dict[int, tuple[int, float]] = {}
 
-@dataclass
+
+@dataclass(slots=True)
 class AuthContext:
     profile_id: int
     email: str
@@ -64,12 +73,90 @@ def issue_access_token(profile_id: int) -> str:
         "INSERT INTO access_tokens(profile_id, token, issued_at) VALUES (?, ?, ?)",
         (profile_id, raw_token, current_timestamp()),
     )
+    if settings.stateless_tokens:
+        return issue_stateless_token(profile_id, raw_token)
     payload = {"token": raw_token, "issued_at": format_iso8601(utc_now())}
     return sign_payload(payload)
 
 
+def issue_stateless_token(profile_id: int, raw_token: str) -> str:
+    profile = db.query("SELECT email, display_name, auth_version FROM profiles WHERE id = ?", (profile_id,))[0]
+    membership_map, teams = load_memberships(profile_id)
+    remember_auth_version(profile_id, profile["auth_version"])
+    payload = {
+        "typ": STATELESS_TOKEN_TYPE,
+        "jti": raw_token,
+        "sub": profile_id,
+        "email": profile["email"],
+        "name": profile["display_name"],
+        "ver": profile["auth_version"],
+        "exp": format_iso8601(utc_now() + timedelta(minutes=settings.stateless_token_ttl_minutes)),
+        "teams": [[team["team_id"], team["role"], team["name"]] for team in teams],
+    }
+    return sign_payload(payload)
+
+
+def load_memberships(profile_id: int) -> tuple[dict[int, str], list[dict[str, Any]]]:
+    memberships = db.query("SELECT team_members.team_id, team_members.role, teams.name FROM team_members JOIN teams ON teams.id = team_members.team_id WHERE team_members.profile_id = ?", (profile_id,))
+    membership_map = {m["team_id"]: m["role"] for m in memberships}
+    teams = [row_to_dict(m) for m in memberships]
+    return membership_map, teams
+
+
+def remember_auth_version(profile_id: int, version: int) -> None:
+    with _auth_versions_lock:
+        _auth_versions[profile_id] = (version, time.monotonic())
+
+
+def current_auth_version(profile_id: int) -> int | None:
+    with _auth_versions_lock:
+        cached = _auth_versions.get(profile_id)
+    if cached is not None and time.monotonic() - cached[1] < settings.auth_version_cache_seconds:
+        return cached[0]
+    rows = db.query("SELECT auth_version FROM profiles WHERE id = ?", (profile_id,))
+    if not rows:
+        return None
+    remember_auth_version(profile_id, rows[0]["auth_version"])
+    return rows[0]["auth_version"]
+
+
+def bump_auth_version(profile_id: int) -> None:
+    db.execute("UPDATE profiles SET auth_version = auth_version + 1 WHERE id = ?", (profile_id,))
+    with _auth_versions_lock:
+        _auth_versions.pop(profile_id, None)
+
+
+def _resolve_stateless_token(payload: dict[str, Any]) -> dict[str, Any]:
+    if parse_iso8601(payload["exp"]) <= utc_now():
+        raise AuthError("Token expired")
+    profile_id = payload["sub"]
+    if current_auth_version(profile_id) == payload["ver"]:
+        return {
+            "profile_id": profile_id,
+            "email": payload["email"],
+            "display_name": payload.get("name"),
+            "memberships": {team_id: role for team_id, role, _ in payload["teams"]},
+            "teams": [{"team_id": team_id, "role": role, "name": name} for team_id, role, name in payload["teams"]],
+        }
+    # The claims are stale: the token survives only if it has not been revoked,
+    # and memberships come from the database instead of the token.
+    row = db.query("SELECT profiles.email, profiles.display_name FROM access_tokens JOIN profiles ON profiles.id = access_tokens.profile_id WHERE access_tokens.token = ? AND access_tokens.profile_id = ?", (payload["jti"], profile_id))
+    if not row:
+        raise AuthError("Token revoked")
+    membership_map, teams = load_memberships(profile_id)
+    return {
+        "profile_id": profile_id,
+        "email": row[0]["email"],
+        "display_name": row[0]["display_name"],
+        "memberships": membership_map,
+        "teams": teams,
+    }
+
+
 def resolve_access_token(token: str) -> dict[str, Any]:
     payload = verify_token(token)
+    if payload.get("typ") == STATELESS_TOKEN_TYPE:
+        return _resolve_stateless_token(payload)
     raw_token = payload.get("token")
     if not raw_token:
         raise AuthError("Token missing inner value")
@@ -78,9 +165,7 @@ def resolve_access_token(token: str) -> dict[str, Any]:
         raise AuthError("Token revoked")
     db.execute("UPDATE access_tokens SET last_used_at = ? WHERE token = ?", (current_timestamp(), raw_token))
     record = row_to_dict(row[0])
-    memberships = db.query("SELECT team_members.team_id, team_members.role, teams.name FROM team_members JOIN teams ON teams.id = team_members.team_id WHERE team_members.profile_id = ?", (record["profile_id"],))
-    membership_map = {m["team_id"]: m["role"] for m in memberships}
-    teams = [row_to_dict(m) for m in memberships]
+    membership_map, teams = load_memberships(record["profile_id"])
     return {
         "profile_id": record["profile_id"],
         "email": record["email"],
@@ -91,6 +176,8 @@ def resolve_access_token(token: str) -> dict[str, Any]:
 
 
 def require_auth(request: Request) -> AuthContext | Response:
+    if request.auth_context is not None:
+        return request.auth_context
     header = request.headers.get("Authorization")
     if not header or not header.startswith("Bearer "):
         return error_response("Missing authorization", HTTPStatus.UNAUTHORIZED)
@@ -99,13 +186,14 @@ def require_auth(request: Request) -> AuthContext | Response:
         payload = resolve_access_token(token)
     except AuthError as exc:
         return error_response(str(exc), HTTPStatus.UNAUTHORIZED)
-    return AuthContext(
+    request.auth_context = AuthContext(
         profile_id=payload["profile_id"],
         email=payload["email"],
         display_name=payload.get("display_name"),
         teams=payload["teams"],
         memberships=payload["memberships"],
     )
+    return request.auth_context
 
 
 def enforce_team_access(context: AuthContext, team_id: int) -> str:
@@ -148,19 +236,17 @@ def onboarding_from_invite(email: str, invite_row: dict[str, Any], profile_paylo
             "INSERT INTO team_members(team_id, profile_id, role, joined_at) VALUES (?, ?, ?, ?)",
             (invite_row["team_id"], profile_id, invite_row["role"], now),
         )
-    else:
+        bump_auth_version(profile_id)
+    elif member[0]["role"] != invite_row["role"]:
         db.execute(
             "UPDATE team_members SET role = ? WHERE id = ?",
             (invite_row["role"], member[0]["id"]),
         )
-    db.execute("UPDATE invites SET accepted_at = ?, expires_at = ? WHERE id = ?", (now, invite_row["expires_at"], invite_row["id"]))
+        bump_auth_version(profile_id)
+    with db.use_team(invite_row["team_id"]):
+        db.execute("UPDATE invites SET accepted_at = ?, expires_at = ? WHERE id = ?", (now, invite_row["expires_at"], invite_row["id"]))
     issued_token = issue_access_token(profile_id)
-    memberships = db.query(
-        "SELECT team_members.team_id, team_members.role, teams.name FROM team_members JOIN teams ON teams.id = team_members.team_id WHERE team_members.profile_id = ?",
-        (profile_id,),
-    )
-    teams = [row_to_dict(row) for row in memberships]
-    membership_map = {row["team_id"]: row["role"] for row in memberships}
+    membership_map, teams = load_memberships(profile_id)
     profile_row = db.query("SELECT * FROM profiles WHERE id = ?", (profile_id,))[0]
     return {
         "profile": row_to_dict(profile_row),
@@ -183,7 +269,7 @@ def handle_magic_login(request: Request) -> Response:
         return error_response("Email and invite code are required")
     if settings.season_access_code and settings.season_access_code != season_code:
         return error_response("Season access code is invalid", HTTPStatus.FORBIDDEN)
-    invite_rows = db.query(
+    invite_rows = db.query_all_shards(
         "SELECT invites.*, teams.name as team_name FROM invites JOIN teams ON teams.id = invites.team_id WHERE invites.email = ? AND invites.code = ?",
         (email, invite_code),
     )
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .config import settings
+from .db import Database, db, read_only_uri
+
+
+class BackupError(Exception):
+    pass
+
+
+def integrity_check(path: str) -> str:
+    connection = sqlite3.connect(read_only_uri(path), uri=True)
+    try:
+        rows = connection.execute("PRAGMA integrity_check").fetchall()
+    except sqlite3.DatabaseError as exc:
+        # "file is not a database" and similar: report it like any other failed check.
+        return str(exc)
+    finally:
+        connection.close()
+    return "; ".join(str(row[0]) for row in rows)
+
+
+MANIFEST = "manifest.json"
+
+
+def verify_backup(path: str) -> str:
+    if Path(path).is_dir():
+        return _verify_backup_set(path)
+    if not path.endswith(".gz"):
+        return integrity_check(path)
+    with tempfile.TemporaryDirectory() as workdir:
+        restored = os.path.join(workdir, "restore.db")
+        with gzip.open(path, "rb") as source, open(restored, "wb") as destination:
+            shutil.copyfileobj(source, destination)
+        return integrity_check(restored)
+
+
+def _verify_backup_set(path: str) -> str:
+    try:
+        manifest = json.loads((Path(path) / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        return f"{MANIFEST}: {exc}"
+    problems = []
+    for entry in manifest["files"]:
+        member = Path(path) / entry["name"]
+        integrity = verify_backup(str(member)) if member.exists() else "missing"
+        if integrity != "ok":
+            problems.append(f"{entry['name']}: {integrity}")
+    return "; ".join(problems) or "ok"
+
+
+def default_backup_path(compress: bool = False) -> str:
+    stamp = datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    suffix = ".db.gz" if compress else ".db"
+    return str(Path(settings.backup_dir) / f"otj_u8-{stamp}{suffix}")
+
+
+def _backup_file(database: Database, source: str, target: str, pages: int, sleep_ms: int, compress: bool) -> dict[str, Any]:
+    snapshot = target[:-3] if compress else target
+    snapshot = f"{snapshot}.partial"
+    try:
+        result = database.backup(snapshot, pages=pages, sleep=sleep_ms / 1000, source_path=source)
+        if compress:
+            with open(snapshot, "rb") as source_file, gzip.open(target, "wb") as destination:
+                shutil.copyfileobj(source_file, destination)
+            os.remove(snapshot)
+        else:
+            os.replace(snapshot, target)
+    finally:
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+    result["path"] = target
+    result["bytes"] = os.path.getsize(target)
+    result["compressed"] = compress
+    return result
+
+
+def create_backup(
+    target: str,
+    database: Database = db,
+    pages: int | None = None,
+    sleep_ms: int | None = None,
+    compress: bool = False,
+    verify: bool = True,
+) -> dict[str, Any]:
+    """Back up every database file; a single-file deployment gives one file, anything else a directory set."""
+    pages = pages if pages is not None else settings.backup_pages_per_step
+    sleep_ms = sleep_ms if sleep_ms is not None else settings.backup_step_sleep_ms
+    files = database.database_files()
+    if len(files) > 1:
+        return _create_backup_set(target, database, files, pages, sleep_ms, compress, verify)
+    if compress and not target.endswith(".gz"):
+        target = f"{target}.gz"
+    Path(target).parent.mkdir(parents=True, exist_ok=True)
+    result = _backup_file(database, database.path, target, pages, sleep_ms, compress)
+    if verify:
+        integrity = verify_backup(target)
+        result["integrity"] = integrity
+        if integrity != "ok":
+            raise BackupError(f"Backup failed integrity check: {integrity}")
+    return result
+
+
+def _create_backup_set(
+    target: str,
+    database: Database,
+    files: list[tuple[str, str]],
+    pages: int,
+    sleep_ms: int,
+    compress: bool,
+    verify: bool,
+) -> dict[str, Any]:
+    # Shards and archives live in separate files, so the backup is a directory with
+    # one copy per file. Files are copied one after another, not as a single snapshot.
+    for suffix in (".gz", ".db"):
+        target = target[: -len(suffix)] if target.endswith(suffix) else target
+    started = time.monotonic()
+    partial = Path(f"{target}.partial")
+    shutil.rmtree(partial, ignore_errors=True)
+    partial.mkdir(parents=True)
+    entries = []
+    try:
+        for name, source in files:
+            member = partial / (f"{name}.gz" if compress else name)
+            result = _backup_file(database, source, str(member), pages, sleep_ms, compress)
+            entry = {"name": member.name, "source": source, "pages": result["pages"], "bytes": result["bytes"]}
+            if verify:
+                entry["integrity"] = verify_backup(str(member))
+            entries.append(entry)
+        manifest = {"created_at": datetime.now(tz=timezone.utc).isoformat(), "compressed": compress, "files": entries}
+        (partial / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(partial, target)
+    finally:
+        shutil.rmtree(partial, ignore_errors=True)
+    result = {
+        "path": target,
+        "files": entries,
+        "bytes": sum(entry["bytes"] for entry in entries),
+        "compressed": compress,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+    if verify:
+        problems = [f"{entry['name']}: {entry['integrity']}" for entry in entries if entry["integrity"] != "ok"]
+        result["integrity"] = "; ".join(problems) or "ok"
+        if problems:
+            raise BackupError(f"Backup failed integrity check: {result['integrity']}")
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Online backup of the OTJ U8s SQLite database")
+    parser.add_argument("target", nargs="?", help="Destination file, or directory for sharded/archived deployments (defaults to BACKUP_DIR/otj_u8-<timestamp>.db)")
+    parser.add_argument("--pages", type=int, default=settings.backup_pages_per_step, help="Pages copied per step")
+    parser.add_argument("--sleep-ms", type=int, default=settings.backup_step_sleep_ms, help="Pause between steps")
+    parser.add_argument("--gzip", action="store_true", help="Write gzip-compressed output")
+    parser.add_argument("--no-verify", action="store_true", help="Skip PRAGMA integrity_check on the result")
+    parser.add_argument("--verify-only", metavar="PATH", help="Only verify an existing backup file or backup set directory")
+    args = parser.parse_args(argv)
+    if args.verify_only:
+        integrity = verify_backup(args.verify_only)
+        print(integrity)
+        raise SystemExit(0 if integrity == "ok" else 1)
+    target = args.target or default_backup_path(args.gzip)
+    try:
+        result = create_backup(target, pages=args.pages, sleep_ms=args.sleep_ms, compress=args.gzip, verify=not args.no_verify)
+    except BackupError as exc:
+        print(exc)
+        raise SystemExit(1)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -33,11 +33,25 @@ def env_list(key: str, default: tuple[str, ...]) -> tuple[str, ...]:
 @dataclass(frozen=True)
 class Settings:
     database_path: str = os.getenv("DATABASE_PATH", "./otj_u8.db")
+    # Serve GET routes from per-thread read-only connections (enables WAL)
+    database_read_connections: bool = env_bool("DATABASE_READ_CONNECTIONS", True)
+    # When set, team-scoped tables live in one SQLite file per team under this directory
+    database_shard_dir: str | None = os.getenv("DATABASE_SHARD_DIR")
+    # Closed seasons moved out by python -m app.archive; attached read-only as "archive"
+    database_archive_path: str | None = os.getenv("DATABASE_ARCHIVE_PATH")
+    # Writes take turns on one writer thread, and turns that overlap share a single commit
+    group_commit: bool = env_bool("GROUP_COMMIT", True)
+    group_commit_window_ms: int = env_int("GROUP_COMMIT_WINDOW_MS", 0)
+    group_commit_max_batch: int = env_int("GROUP_COMMIT_MAX_BATCH", 64)
+    # Entries kept by db.cached_query for hot lookups; 0 sends every call to SQLite
+    query_cache_size: int = env_int("QUERY_CACHE_SIZE", 1024)
     app_secret: str = os.getenv("APP_SECRET", "dev-secret")
     base_url: str = os.getenv("APP_BASE_URL", "http://localhost:8000")
     invite_ttl_hours: int = env_int("INVITE_TTL_HOURS", 120)
     session_lock_grace_minutes: int = env_int("SESSION_LOCK_GRACE_MINUTES", 5)
     season_access_code: str | None = os.getenv("SEASON_ACCESS_CODE")
+    # Attendance statistics group sessions into seasons starting on the 1st of this month (UTC)
+    season_start_month: int = env_int("SEASON_START_MONTH", 9)
     smtp_host: str | None = os.getenv("SMTP_HOST")
     smtp_port: int = env_int("SMTP_PORT", 587)
     smtp_username: str | None = os.getenv("SMTP_USERNAME")
@@ -52,9 +66,56 @@ class Settings:
     )
     cors_allowed_headers: tuple[str, ...] = env_list(
         "CORS_ALLOWED_HEADERS",
-        ("Authorization", "Content-Type"),
+        ("Authorization", "Content-Type", "Idempotency-Key"),
     )
+    # Response headers browsers may show to cross-origin scripts
+    cors_exposed_headers: tuple[str, ...] = env_list("CORS_EXPOSED_HEADERS", ("Idempotent-Replayed",))
     cors_allow_credentials: bool = env_bool("CORS_ALLOW_CREDENTIALS", False)
+    # Stateless access tokens carry memberships and an auth_version; verified without SQL
+    stateless_tokens: bool = env_bool("STATELESS_TOKENS", False)
+    stateless_token_ttl_minutes: int = env_int("STATELESS_TOKEN_TTL_MINUTES", 7 * 24 * 60)
+    auth_version_cache_seconds: int = env_int("AUTH_VERSION_CACHE_SECONDS", 30)
+    # How long a validated calendar feed token is trusted from memory before revoked_at is re-checked
+    feed_token_cache_seconds: int = env_int("FEED_TOKEN_CACHE_SECONDS", 30)
+    # Admission control: token buckets are "<requests>/<seconds>"; route overrides are
+    # "<METHOD> <pattern>=<requests>/<seconds>" and apply per access token (or address)
+    rate_limit_enabled: bool = env_bool("RATE_LIMIT_ENABLED", True)
+    rate_limit_per_token: str = os.getenv("RATE_LIMIT_PER_TOKEN", "300/60")
+    rate_limit_per_address: str = os.getenv("RATE_LIMIT_PER_ADDRESS", "600/60")
+    # Reverse proxies (addresses or CIDR ranges) whose X-Forwarded-For names the real client;
+    # without them every client behind a proxy shares the proxy's address bucket
+    trusted_proxies: tuple[str, ...] = env_list("TRUSTED_PROXIES", ())
+    rate_limit_routes: tuple[str, ...] = env_list(
+        "RATE_LIMIT_ROUTES",
+        # A series inserts up to 200 sessions and emails the roster, so it gets a tighter budget than one session.
+        ("POST /teams/:team_id/sessions=10/60", "POST /teams/:team_id/sessions/series=2/60"),
+    )
+    max_concurrent_requests: int = env_int("MAX_CONCURRENT_REQUESTS", 32)
+    max_queued_requests: int = env_int("MAX_QUEUED_REQUESTS", 64)
+    queue_timeout_ms: int = env_int("QUEUE_TIMEOUT_MS", 5000)
+    # Responses to mutating requests carrying an Idempotency-Key are replayed for this long
+    idempotency_ttl_hours: int = env_int("IDEMPOTENCY_TTL_HOURS", 24)
+    # An in-flight claim whose request never finished (e.g. the process died) is released after this
+    idempotency_lease_seconds: int = env_int("IDEMPOTENCY_LEASE_SECONDS", 60)
+    # POST /batch limits; concurrent batches of GETs share this many worker threads
+    batch_max_requests: int = env_int("BATCH_MAX_REQUESTS", 20)
+    batch_max_workers: int = env_int("BATCH_MAX_WORKERS", 4)
+    # Requests slower than this are logged with their SQL timings (0 disables)
+    slow_request_ms: int = env_int("SLOW_REQUEST_MS", 500)
+    # Measure each route's per-request memory with tracemalloc (slows every request; reported at /internal/allocations)
+    trace_allocations: bool = env_bool("TRACE_ALLOCATIONS", False)
+    # Internal operations (backups) are guarded by a shared token sent as X-Internal-Token
+    internal_api_token: str | None = os.getenv("INTERNAL_API_TOKEN")
+    backup_dir: str = os.getenv("BACKUP_DIR", "./backups")
+    backup_pages_per_step: int = env_int("BACKUP_PAGES_PER_STEP", 256)
+    backup_step_sleep_ms: int = env_int("BACKUP_STEP_SLEEP_MS", 50)
+    # ASGI server (python -m app.asgi): worker threads for handlers, and the largest accepted request body
+    asgi_worker_threads: int = env_int("ASGI_WORKER_THREADS", 16)
+    asgi_mail_threads: int = env_int("ASGI_MAIL_THREADS", 2)
+    max_request_body_bytes: int = env_int("MAX_REQUEST_BODY_BYTES", 1024 * 1024)
+    # Serve the built frontend (python -m app.assets) at / and /static/
+    serve_frontend: bool = env_bool("SERVE_FRONTEND", False)
+    frontend_dist_dir: str = os.getenv("FRONTEND_DIST_DIR", "./frontend-dist")
 
     @property
     def invite_ttl(self) -> timedelta:
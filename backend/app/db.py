@@ -1,78 +1,685 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import queue
+import re
 import sqlite3
-from dataclasses import dataclass
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
+from urllib.parse import quote
 
 from .config import settings
 
+def latest_migration(directory: Path) -> int:
+    """Number of the highest NNN_*.sql file; a directory listing, so startup still skips reading the files."""
+    return max((int(path.name.split("_", 1)[0]) for path in directory.glob("[0-9]*.sql")), default=0)
+
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "migrations"
+# When PRAGMA user_version already matches, startup skips the migration machinery.
+SCHEMA_VERSION = latest_migration(MIGRATIONS_DIR)
+# Team-scoped tables (sessions, rsvps, invites, activity_logs) get their own
+# schema when DATABASE_SHARD_DIR splits them into one file per team.
+SHARD_MIGRATIONS_DIR = MIGRATIONS_DIR / "shard"
+SHARD_SCHEMA_VERSION = latest_migration(SHARD_MIGRATIONS_DIR)
+# History tables for closed seasons, moved out of the hot tables by app.archive.
+ARCHIVE_MIGRATIONS_DIR = MIGRATIONS_DIR / "archive"
+ARCHIVE_SCHEMA_VERSION = latest_migration(ARCHIVE_MIGRATIONS_DIR)
+
+# Target table of a write, and the tables a cached SELECT reads from.
+WRITE_TARGET = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(?:\w+\.)?[\"`\[]?(\w+)",
+    re.IGNORECASE,
+)
+READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+(?:\w+\.)?[\"`\[]?(\w+)", re.IGNORECASE)
+# Statements that never change table contents, so they leave the query cache alone.
+NON_WRITES = ("SELECT", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "ATTACH", "DETACH", "EXPLAIN")
+
+
+class MigrationError(Exception):
+    pass
+
+
+@dataclass
+class WriteTurn:
+    """One caller's place in a group commit; its statements run inside a savepoint of the shared transaction."""
+
+    granted: threading.Event = field(default_factory=threading.Event)
+    finished: threading.Event = field(default_factory=threading.Event)
+    settled: threading.Event = field(default_factory=threading.Event)
+    failed: bool = False
+    error: BaseException | None = None
+
 
 @dataclass
-class Migration:
-    version: str
-    path: Path
+class TracedStatement:
+    sql: str
+    params: tuple[Any, ...]
+    elapsed_ms: float
+    connection: sqlite3.Connection
 
 
 class Database:
-    def __init__(self, path: str):
+    def __init__(self, path: str, read_connections: bool = True, shard_dir: str | None = None, archive_path: str | None = None, cache_size: int = 0, group_commit: bool = False, group_commit_window_ms: int = 0, group_commit_max_batch: int = 64):
         self.path = path
+        self.read_connections = read_connections and path != ":memory:"
+        self.shard_dir = shard_dir
+        self.archive_file = archive_path
         self._connection: sqlite3.Connection | None = None
+        self._shards: dict[int, sqlite3.Connection] = {}
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[Any, ...], tuple[list[sqlite3.Row], frozenset[str]]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generations: dict[str, int] = {}
+        self._cache_stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        self._cascades: dict[str, set[str]] | None = None
+        self._shard_tables: set[str] | None = None
+        # PRAGMA data_version per (writer, schema), as last seen by cached_query.
+        self._data_versions: dict[tuple[int | None, str], int] = {}
+        self._data_version_lock = threading.Lock()
+        self.group_commit = group_commit
+        self.group_commit_window = group_commit_window_ms / 1000
+        self.group_commit_max_batch = max(1, group_commit_max_batch)
+        # One turn queue and writer thread per file (None is the core file), so shards commit independently.
+        self._write_queues: dict[int | None, queue.SimpleQueue[WriteTurn | None]] = {}
+        self._writer_threads: dict[int | None, threading.Thread] = {}
+        self._writer_thread_lock = threading.Lock()
+        # Without group commit, request threads take turns on each shared writer connection directly.
+        self._writer_locks: dict[int | None, threading.RLock] = {}
+
+    def _open(self, path: str, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            connection = sqlite3.connect(
+                read_only_uri(path),
+                uri=True,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+            )
+            connection.execute("PRAGMA query_only = ON")
+        else:
+            # Writers are shared across request threads; readers stay thread-local.
+            # uri=True only so the read-only archive can be attached with a file: URI.
+            connection = sqlite3.connect(path, uri=True, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+            connection.execute("PRAGMA foreign_keys = ON")
+            # REPLACE conflict resolution only fires delete triggers (which keep the FTS indexes in sync) with this on.
+            connection.execute("PRAGMA recursive_triggers = ON")
+            if self.read_connections:
+                # WAL lets the read-only connections keep reading while the writer commits.
+                connection.execute("PRAGMA journal_mode = WAL")
+        connection.row_factory = sqlite3.Row
+        return connection
 
     @property
     def connection(self) -> sqlite3.Connection:
         if self._connection is None:
-            needs_init = not Path(self.path).exists()
-            self._connection = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES)
-            self._connection.row_factory = sqlite3.Row
-            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection = self._open(self.path)
         return self._connection
 
+    def shard_path(self, team_id: int) -> str:
+        return str(Path(self.shard_dir) / f"team_{int(team_id)}.db")
+
+    def archive_path(self, team_id: int | None = None) -> str | None:
+        if not self.archive_file:
+            return None
+        if team_id is not None:
+            # Session ids are only unique within a shard, so each shard archives to its own file.
+            return str(Path(self.shard_dir) / f"archive_team_{int(team_id)}.db")
+        return self.archive_file
+
+    def has_archive(self, for_write: bool = False) -> bool:
+        """Attach the archive to the connection queries use now, if one has been written.
+
+        Pass for_write before opening a transaction that reads the archive, so it lands on the writer.
+        """
+        connection = self.reader if self._routes_to_reader() and not for_write else self.writer
+        if any(row[1] == "archive" for row in connection.execute("PRAGMA database_list")):
+            return True
+        path = self.archive_path(getattr(self._local, "team_id", None))
+        if not path or not Path(path).exists():
+            return False
+        try:
+            connection.execute("ATTACH DATABASE ? AS archive", (read_only_uri(path),))
+        except sqlite3.OperationalError:
+            # ATTACH is refused inside an open transaction; history reads retry on the next call.
+            return False
+        return True
+
+    def shard_connection(self, team_id: int) -> sqlite3.Connection:
+        with self._shards_lock:
+            connection = self._shards.get(team_id)
+            if connection is None:
+                Path(self.shard_dir).mkdir(parents=True, exist_ok=True)
+                connection = self._open(self.shard_path(team_id))
+                migrate_connection(connection, SHARD_MIGRATIONS_DIR, SHARD_SCHEMA_VERSION)
+                # Global tables are not present in the shard, so unqualified names
+                # such as profiles or teams resolve to the attached core file.
+                connection.execute("ATTACH DATABASE ? AS core", (self.path,))
+                self._shards[team_id] = connection
+            return connection
+
+    def shard_team_ids(self) -> list[int]:
+        team_ids = {row["id"] for row in self.query("SELECT id FROM teams")}
+        if self.shard_dir and Path(self.shard_dir).exists():
+            team_ids.update(int(path.stem.split("_", 1)[1]) for path in Path(self.shard_dir).glob("team_*.db"))
+        return sorted(team_ids)
+
+    @property
+    def writer(self) -> sqlite3.Connection:
+        return self.writer_for(getattr(self._local, "team_id", None))
+
+    def writer_for(self, team_id: int | None) -> sqlite3.Connection:
+        """The shared read-write connection for the core file, or for one team's shard."""
+        if team_id is None:
+            return self.connection
+        return self.shard_connection(team_id)
+
+    @property
+    def reader(self) -> sqlite3.Connection:
+        team_id = getattr(self._local, "team_id", None)
+        readers = getattr(self._local, "readers", None)
+        if readers is None:
+            readers = self._local.readers = {}
+        reader = readers.get(team_id)
+        if reader is None:
+            # mode=ro cannot create the file or switch it to WAL, and shards are only migrated
+            # by their writer, so the writer must have opened the file before any reader does.
+            self.writer_for(team_id)
+            if team_id is None:
+                reader = self._open(self.path, read_only=True)
+            else:
+                reader = self._open(self.shard_path(team_id), read_only=True)
+                reader.execute("ATTACH DATABASE ? AS core", (read_only_uri(self.path),))
+            readers[team_id] = reader
+        return reader
+
     def close(self) -> None:
+        with self._writer_thread_lock:
+            for team_id, thread in self._writer_threads.items():
+                self._write_queues[team_id].put(None)
+                thread.join()
+            self._writer_threads.clear()
+            self._write_queues.clear()
+        for reader in (getattr(self._local, "readers", None) or {}).values():
+            reader.close()
+        self._local.readers = {}
+        with self._shards_lock:
+            for connection in self._shards.values():
+                connection.close()
+            self._shards.clear()
         if self._connection is not None:
             self._connection.close()
             self._connection = None
+        with self._cache_lock:
+            self._cache.clear()
+        self._data_versions.clear()
+        self._cascades = None
+        self._shard_tables = None
+
+    @contextmanager
+    def use_team(self, team_id: int) -> Iterator[None]:
+        previous = getattr(self._local, "team_id", None)
+        self._local.team_id = int(team_id) if self.shard_dir else None
+        try:
+            yield
+        finally:
+            self._local.team_id = previous
+
+    def _writer_lock(self, team_id: int | None) -> threading.RLock:
+        with self._shards_lock:
+            lock = self._writer_locks.get(team_id)
+            if lock is None:
+                lock = self._writer_locks[team_id] = threading.RLock()
+            return lock
+
+    @contextmanager
+    def transaction(self) -> Iterator[Database]:
+        depth = getattr(self._local, "write_depth", 0)
+        lock = None
+        if depth == 0 and not self.group_commit:
+            # One sqlite3 connection cannot interleave two threads' transactions or cursors.
+            lock = self._writer_lock(getattr(self._local, "team_id", None))
+            lock.acquire()
+        try:
+            with self._transaction(depth):
+                yield self
+        finally:
+            if lock is not None:
+                lock.release()
+
+    @contextmanager
+    def _transaction(self, depth: int) -> Iterator[None]:
+        turn = self._wait_for_turn() if depth == 0 and self.group_commit else None
+        writer = self.writer
+        self._local.write_depth = depth + 1
+        try:
+            yield
+        except BaseException:
+            if turn is not None:
+                self._finish_turn(turn, failed=True)
+            elif depth == 0:
+                writer.rollback()
+            raise
+        else:
+            if turn is not None:
+                self._finish_turn(turn, failed=False)
+            elif depth == 0:
+                writer.commit()
+        finally:
+            self._local.write_depth = depth
+            dirty = getattr(self._local, "dirty_tables", None)
+            if depth == 0 and dirty:
+                # Readers on other threads may have cached the pre-commit rows in the meantime.
+                self._local.dirty_tables = set()
+                self.invalidate(*dirty)
+
+    def _wait_for_turn(self) -> WriteTurn:
+        team_id = getattr(self._local, "team_id", None)
+        with self._writer_thread_lock:
+            write_queue = self._write_queues.get(team_id)
+            if write_queue is None:
+                write_queue = self._write_queues[team_id] = queue.SimpleQueue()
+                name = "otj-db-writer" if team_id is None else f"otj-db-writer-{team_id}"
+                thread = threading.Thread(target=self._write_loop, args=(team_id, write_queue), name=name, daemon=True)
+                self._writer_threads[team_id] = thread
+                thread.start()
+        turn = WriteTurn()
+        write_queue.put(turn)
+        turn.granted.wait()
+        if turn.error is not None:
+            raise turn.error
+        return turn
+
+    def _finish_turn(self, turn: WriteTurn, failed: bool) -> None:
+        turn.failed = failed
+        turn.finished.set()
+        # Return only once the whole group is durable, or report why it is not.
+        turn.settled.wait()
+        if not failed and turn.error is not None:
+            raise turn.error
+
+    def _write_loop(self, team_id: int | None, write_queue: queue.SimpleQueue[WriteTurn | None]) -> None:
+        """Hand out write turns for one file in arrival order, committing each run of overlapping turns together."""
+        while True:
+            turn = write_queue.get()
+            if turn is None:
+                return
+            group = [turn]
+            connection: sqlite3.Connection | None = None
+            try:
+                connection = self.writer_for(team_id)
+                # BEGIN IMMEDIATE would also reserve every attached file, core included, and stall the
+                # core writer. Nothing else in this process writes a shard, so it can lock on first write.
+                connection.execute("BEGIN IMMEDIATE" if team_id is None else "BEGIN")
+                while turn is not None:
+                    connection.execute("SAVEPOINT write_turn")
+                    turn.granted.set()
+                    turn.finished.wait()
+                    if turn.failed:
+                        connection.execute("ROLLBACK TO write_turn")
+                    connection.execute("RELEASE write_turn")
+                    turn = self._next_turn(group, write_queue)
+                connection.commit()
+            except BaseException as exc:  # pylint: disable=broad-except
+                if connection is not None and connection.in_transaction:
+                    connection.rollback()
+                for member in group:
+                    member.error = member.error or exc
+                    # A turn that never started must not wait forever for its grant.
+                    member.granted.set()
+            finally:
+                for member in group:
+                    member.settled.set()
+
+    def _next_turn(self, group: list[WriteTurn], write_queue: queue.SimpleQueue[WriteTurn | None]) -> WriteTurn | None:
+        if len(group) >= self.group_commit_max_batch:
+            return None
+        try:
+            turn = write_queue.get_nowait()
+        except queue.Empty:
+            # A lone writer commits at once; the window only applies once writes are already overlapping.
+            if len(group) == 1 or not self.group_commit_window:
+                return None
+            try:
+                turn = write_queue.get(timeout=self.group_commit_window)
+            except queue.Empty:
+                return None
+        if turn is None:
+            # close() asked this thread to stop; finish the group first.
+            write_queue.put(None)
+            return None
+        group.append(turn)
+        return turn
+
+    def _routes_to_reader(self) -> bool:
+        # The shared writer is usually inside some request's open transaction, so only reads that
+        # belong to the caller's own transaction may run on it.
+        return self.read_connections and not getattr(self._local, "write_depth", 0)
+
+    @contextmanager
+    def trace_statements(self) -> Iterator[list[TracedStatement]]:
+        previous = getattr(self._local, "trace", None)
+        trace: list[TracedStatement] = []
+        self._local.trace = trace
+        try:
+            yield trace
+        finally:
+            self._local.trace = previous
+
+    def _record(self, connection: sqlite3.Connection, sql: str, params: tuple[Any, ...], started: float) -> None:
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace.append(TracedStatement(sql, params, (time.perf_counter() - started) * 1000, connection))
+
+    @contextmanager
+    def _standalone(self, sql: str) -> Iterator[None]:
+        """A statement outside any transaction is its own one: a group-commit turn, or the writer lock."""
+        team_id = getattr(self._local, "team_id", None)
+        if team_id is not None and self._writes_core_only(sql):
+            # Core rows written from a team's scope (token use, profile edits) commit on the core
+            # file's writer, so the shard's writer never has to reserve the attached core file.
+            self._local.team_id = None
+        try:
+            with self.transaction():
+                yield
+        finally:
+            self._local.team_id = team_id
+
+    def _writes_core_only(self, sql: str) -> bool:
+        match = WRITE_TARGET.match(sql)
+        if match is None:
+            return False
+        if self._shard_tables is None:
+            self._shard_tables = {row[0].lower() for row in self.writer.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+        return match.group(1).lower() not in self._shard_tables
 
     def execute(self, sql: str, params: Iterable[Any] | None = None) -> sqlite3.Cursor:
-        cur = self.connection.cursor()
-        cur.execute(sql, tuple(params or []))
-        self.connection.commit()
+        if not getattr(self._local, "write_depth", 0):
+            with self._standalone(sql):
+                return self.execute(sql, params)
+        writer = self.writer
+        params = tuple(params or [])
+        started = time.perf_counter()
+        cur = writer.cursor()
+        cur.execute(sql, params)
+        self._record(writer, sql, params, started)
+        self._mark_written(sql)
         return cur
 
+    def executemany(self, sql: str, rows: Iterable[Iterable[Any]]) -> sqlite3.Cursor:
+        if not getattr(self._local, "write_depth", 0):
+            with self._standalone(sql):
+                return self.executemany(sql, rows)
+        writer = self.writer
+        rows = [tuple(row) for row in rows]
+        started = time.perf_counter()
+        cur = writer.cursor()
+        cur.executemany(sql, rows)
+        # The first row stands in for the batch so slow-request logs can still explain the plan.
+        self._record(writer, sql, rows[0] if rows else (), started)
+        self._mark_written(sql)
+        return cur
+
+    def _mark_written(self, sql: str) -> None:
+        # Runs even with the cache off: table_stamp callers rely on the generations moving.
+        written = self._written_tables(sql)
+        if getattr(self._local, "write_depth", 0):
+            self._local.dirty_tables = getattr(self._local, "dirty_tables", set()) | written
+        self.invalidate(*written)
+
     def query(self, sql: str, params: Iterable[Any] | None = None) -> list[sqlite3.Row]:
-        cur = self.connection.cursor()
-        cur.execute(sql, tuple(params or []))
+        if self._routes_to_reader():
+            return self._query(self.reader, sql, params)
+        if not getattr(self._local, "write_depth", 0):
+            # Without read connections a read takes its own turn on the writer (or its lock under
+            # GROUP_COMMIT=false), so it never sees another request's uncommitted rows.
+            with self.transaction():
+                return self._query(self.writer, sql, params)
+        return self._query(self.writer, sql, params)
+
+    def _query(self, connection: sqlite3.Connection, sql: str, params: Iterable[Any] | None) -> list[sqlite3.Row]:
+        params = tuple(params or [])
+        started = time.perf_counter()
+        cur = connection.cursor()
+        cur.execute(sql, params)
         rows = cur.fetchall()
+        self._record(connection, sql, params, started)
         return rows
 
-    def migrate(self) -> None:
-        migrations_dir = Path(__file__).parent.parent / "migrations"
-        applied = {row["version"] for row in self.query("SELECT version FROM schema_migrations")} if self._has_schema_table() else set()
-        for migration_file in sorted(migrations_dir.glob("*.sql")):
-            version = migration_file.stem
-            if version in applied:
-                continue
-            sql = migration_file.read_text()
-            statements = [stmt.strip() for stmt in sql.split(";\n") if stmt.strip()]
-            for statement in statements:
-                self.execute(statement)
-            self.execute("INSERT INTO schema_migrations(version, applied_at) VALUES(?, ?)", (version, current_timestamp()))
-
-    def _has_schema_table(self) -> bool:
-        cur = self.connection.cursor()
-        cur.execute("""
-            SELECT name FROM sqlite_master
-            WHERE type = 'table' AND name = 'schema_migrations'
-        """)
-        exists = cur.fetchone() is not None
-        if not exists:
-            self.connection.execute(
-                "CREATE TABLE IF NOT EXISTS schema_migrations (version TEXT PRIMARY KEY, applied_at TEXT NOT NULL)"
-            )
-            self.connection.commit()
-        return True
+    def cached_query(self, sql: str, params: Iterable[Any] | None = None, tags: Iterable[str] | None = None) -> list[sqlite3.Row]:
+        """Like query, but repeated calls are answered from an LRU until a write touches one of its tables.
+
+        Tags default to the tables named after FROM and JOIN. Writes made through execute (or announced
+        with invalidate) drop matching entries; pass tags for anything the SQL hides. Commits by other
+        processes drop the whole cache before the next lookup.
+        """
+        if not self.cache_size or getattr(self._local, "write_depth", 0):
+            # Inside a transaction the writer sees uncommitted rows that must not be shared.
+            return self.query(sql, params)
+        params = tuple(params or [])
+        team_id = getattr(self._local, "team_id", None)
+        self._check_foreign_writes(team_id)
+        key = (team_id, sql, params)
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self._cache_stats["hits"] += 1
+                return list(entry[0])
+            self._cache_stats["misses"] += 1
+            tag_set = frozenset(tag.lower() for tag in tags) if tags is not None else frozenset(name.lower() for name in READ_TABLES.findall(sql))
+            generations = self._generations(tag_set)
+        rows = self.query(sql, params)
+        with self._cache_lock:
+            # A write that landed while the query ran may not be in these rows.
+            if generations == self._generations(tag_set):
+                self._cache[key] = (rows, tag_set)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                    self._cache_stats["evictions"] += 1
+        return list(rows)
+
+    def _check_foreign_writes(self, team_id: int | None) -> None:
+        """Drop the cache if another process committed to the core file or this team's shard since the last look.
+
+        A connection's data_version moves for every commit except its own. Shard writers attach
+        core and commit to it too, so a core change is only foreign once every writer of this
+        process that holds core has seen it move; one that has not made the commit itself.
+        """
+        with self._shards_lock:
+            shards = dict(self._shards)
+        views = [((None, "main"), self.connection)]
+        views += [((shard, "core"), connection) for shard, connection in shards.items()]
+        files = [views]
+        if team_id is not None:
+            files.append([((team_id, "main"), self.writer_for(team_id))])
+        changed = False
+        with self._data_version_lock:
+            for file_views in files:
+                moved = None
+                for key, connection in file_views:
+                    # One-row PRAGMA on a shared writer; the serialized sqlite3 build allows it beside other threads.
+                    version = connection.execute(f"PRAGMA {key[1]}.data_version").fetchone()[0]
+                    seen = self._data_versions.get(key)
+                    self._data_versions[key] = version
+                    if seen is None:
+                        # A writer opened since the last look cannot vouch for anything yet.
+                        continue
+                    if seen == version:
+                        # A view that has not moved rules out a foreign commit since that view's last look.
+                        moved = False
+                        break
+                    moved = True
+                changed = changed or bool(moved)
+        if changed:
+            self.invalidate("*")
+
+    def invalidate(self, *tables: str) -> None:
+        """Drop cached results that read any of these tables; "*" or no tables drops everything."""
+        touched = {table.lower() for table in tables} or {"*"}
+        with self._cache_lock:
+            for tag in touched:
+                self._cache_generations[tag] = self._cache_generations.get(tag, 0) + 1
+            if "*" in touched:
+                stale = list(self._cache)
+            else:
+                stale = [key for key, (_, tag_set) in self._cache.items() if tag_set & touched]
+            for key in stale:
+                del self._cache[key]
+            self._cache_stats["invalidations"] += len(stale)
+
+    def table_stamp(self, *tables: str) -> tuple[int, ...]:
+        """A value that changes whenever one of these tables is written, by this process or another one."""
+        self._check_foreign_writes(getattr(self._local, "team_id", None))
+        with self._cache_lock:
+            return self._generations(frozenset(table.lower() for table in tables))
+
+    def _generations(self, tags: frozenset[str]) -> tuple[int, ...]:
+        return tuple(self._cache_generations.get(tag, 0) for tag in ("*", *sorted(tags)))
+
+    def cache_stats(self) -> dict[str, Any]:
+        with self._cache_lock:
+            stats = dict(self._cache_stats)
+            stats["size"] = len(self._cache)
+        lookups = stats["hits"] + stats["misses"]
+        stats["capacity"] = self.cache_size
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
+
+    def _written_tables(self, sql: str) -> set[str]:
+        match = WRITE_TARGET.match(sql)
+        if match is None:
+            if sql.lstrip().upper().startswith(NON_WRITES):
+                return set()
+            # Anything unrecognised (CTE writes, DDL) clears the whole cache.
+            return {"*"}
+        table = match.group(1).lower()
+        return {table} | self._cascaded_tables(table)
+
+    def _cascaded_tables(self, table: str) -> set[str]:
+        # ON DELETE CASCADE / SET NULL rewrite child tables without naming them in the statement.
+        if self._cascades is None:
+            children: dict[str, set[str]] = {}
+            tables = [row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            for child in tables:
+                for parent, on_update, on_delete in self.connection.execute('SELECT "table", on_update, on_delete FROM pragma_foreign_key_list(?)', (child,)):
+                    if {on_update, on_delete} - {"NO ACTION", "RESTRICT"}:
+                        children.setdefault(parent.lower(), set()).add(child.lower())
+            self._cascades = children
+        found: set[str] = set()
+        pending = [table]
+        while pending:
+            for child in self._cascades.get(pending.pop(), ()):
+                if child not in found:
+                    found.add(child)
+                    pending.append(child)
+        return found
+
+    def query_all_shards(self, sql: str, params: Iterable[Any] | None = None) -> list[sqlite3.Row]:
+        if not self.shard_dir:
+            return self.query(sql, params)
+        rows: list[sqlite3.Row] = []
+        for team_id in self.shard_team_ids():
+            with self.use_team(team_id):
+                rows.extend(self.query(sql, params))
+        return rows
+
+    def database_files(self) -> list[tuple[str, str]]:
+        """(backup name, path) for every SQLite file holding this deployment's data, core file first."""
+        files = [("core.db", self.path)]
+        if self.shard_dir:
+            for team_id in self.shard_team_ids():
+                for path in (self.shard_path(team_id), self.archive_path(team_id)):
+                    if path and Path(path).exists():
+                        files.append((Path(path).name, path))
+        if self.archive_file and Path(self.archive_file).exists():
+            files.append(("archive.db", self.archive_file))
+        return files
+
+    def backup(self, target: str, pages: int = 256, sleep: float = 0.05, source_path: str | None = None) -> dict[str, Any]:
+        # A dedicated source connection keeps the shared handle free for request
+        # traffic; SQLite only holds the read lock for each ``pages`` step.
+        started = time.monotonic()
+        progress_state = {"steps": 0, "pages": 0}
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            progress_state["steps"] += 1
+            progress_state["pages"] = total
+            if remaining and sleep > 0:
+                # Connection.backup only sleeps after a busy step; pause between every step so writers get a turn.
+                time.sleep(sleep)
+
+        source = sqlite3.connect(source_path or self.path)
+        destination = sqlite3.connect(target)
+        try:
+            source.backup(destination, pages=pages, progress=progress, sleep=sleep)
+            # The copy inherits WAL mode; switch it back so the backup is a single self-contained file.
+            destination.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            destination.close()
+            source.close()
+        return {
+            "path": target,
+            "pages": progress_state["pages"],
+            "steps": progress_state["steps"],
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        }
+
+    def migrate(self, force: bool = False) -> None:
+        migrate_connection(self.connection, MIGRATIONS_DIR, SCHEMA_VERSION, force)
+        if not self.shard_dir:
+            return
+        Path(self.shard_dir).mkdir(parents=True, exist_ok=True)
+        for team_id in self.shard_team_ids():
+            # Migrate through a fresh, unattached connection so new tables land in the shard.
+            connection = self._open(self.shard_path(team_id))
+            try:
+                migrate_connection(connection, SHARD_MIGRATIONS_DIR, SHARD_SCHEMA_VERSION, force)
+            finally:
+                connection.close()
+
+    def schema_version(self) -> int:
+        return schema_version(self.connection)
+
+
+def read_only_uri(path: str) -> str:
+    # Quoted so "?", "#" and "%" in the path are not read as URI syntax.
+    return f"file:{quote(str(Path(path).resolve()))}?mode=ro"
+
+
+def schema_version(connection: sqlite3.Connection) -> int:
+    return connection.execute("PRAGMA main.user_version").fetchone()[0]
+
+
+def migrate_connection(connection: sqlite3.Connection, directory: Path, latest_version: int, force: bool = False) -> None:
+    if not force and schema_version(connection) >= latest_version:
+        verify_checksums(connection, directory)
+        return
+    # Up-to-date files, the usual case at startup, never load the migration machinery.
+    from .migrations import apply_migrations
+
+    apply_migrations(connection, directory)
+
+
+def verify_checksums(connection: sqlite3.Connection, directory: Path) -> None:
+    """Fail if an applied migration file was edited; hashing the few files is cheap enough for every startup."""
+    try:
+        recorded = dict(connection.execute("SELECT version, checksum FROM main.schema_migrations WHERE checksum IS NOT NULL").fetchall())
+    except sqlite3.OperationalError:
+        # Never migrated by this runner (no bookkeeping table); nothing to compare against.
+        return
+    for path in directory.glob("[0-9]*.sql"):
+        checksum = recorded.get(path.stem)
+        if checksum is not None and checksum != hashlib.sha256(path.read_text().encode("utf-8")).hexdigest():
+            raise MigrationError(f"Migration {path.stem} was modified after it was applied")
 
 
 def current_timestamp() -> str:
@@ -89,4 +696,13 @@ def serialize_payload(payload: dict[str, Any] | None) -> str | None:
     return json.dumps(payload, separators=(",", ":"))
 
 
-db = Database(settings.database_path)
+db = Database(
+    settings.database_path,
+    read_connections=settings.database_read_connections,
+    shard_dir=settings.database_shard_dir,
+    archive_path=settings.database_archive_path,
+    cache_size=settings.query_cache_size,
+    group_commit=settings.group_commit,
+    group_commit_window_ms=settings.group_commit_window_ms,
+    group_commit_max_batch=settings.group_commit_max_batch,
+)
@@ -1,59 +1,104 @@
 from __future__ import annotations
 
 import json
+from collections.abc import Iterator, Mapping
 from dataclasses import dataclass
 from http import HTTPStatus
-from typing import Any, Callable, Optional
+from typing import Any, BinaryIO, Callable, Optional
 from urllib.parse import parse_qs
 
 from .utils.time import format_iso8601, utc_now
 
 
-@dataclass
+# Appended by to_wsgi unless the handler set its own value.
+SECURITY_HEADERS = (("Cache-Control", "no-store"), ("X-Content-Type-Options", "nosniff"))
+
+
+@dataclass(slots=True)
 class Response:
     status: int
-    body: dict[str, Any] | list[Any] | str | None
+    body: dict[str, Any] | list[Any] | str | bytes | None
     headers: dict[str, str] | None = None
+    # Streamed after the headers instead of body; the server closes it once sent.
+    file: BinaryIO | None = None
 
     def to_wsgi(self) -> tuple[int, list[tuple[str, str]], bytes]:
-        if isinstance(self.body, (dict, list)):
-            payload = json.dumps(self.body).encode("utf-8")
-            headers = {"Content-Type": "application/json", **(self.headers or {})}
-        elif isinstance(self.body, str):
-            payload = self.body.encode("utf-8")
-            headers = {"Content-Type": "text/plain; charset=utf-8", **(self.headers or {})}
-        elif self.body is None:
+        body = self.body
+        if isinstance(body, (dict, list)):
+            payload = json.dumps(body).encode("utf-8")
+            content_type = "application/json"
+        elif isinstance(body, str):
+            payload = body.encode("utf-8")
+            content_type = "text/plain; charset=utf-8"
+        elif isinstance(body, bytes):
+            payload = body
+            content_type = "application/octet-stream"
+        elif body is None:
             payload = b""
-            headers = self.headers or {}
+            content_type = None
         else:
             raise TypeError("Unsupported response body type")
-        headers.setdefault("Cache-Control", "no-store")
-        headers.setdefault("X-Content-Type-Options", "nosniff")
-        headers_list = [(key, value) for key, value in headers.items()]
+        # Built straight into a list; the handler's headers dict is never copied or mutated.
+        headers = self.headers
+        if not headers:
+            headers_list = [("Content-Type", content_type), *SECURITY_HEADERS] if content_type else list(SECURITY_HEADERS)
+            return self.status, headers_list, payload
+        headers_list = []
+        if content_type is not None and "Content-Type" not in headers:
+            headers_list.append(("Content-Type", content_type))
+        headers_list.extend(headers.items())
+        for name, value in SECURITY_HEADERS:
+            if name not in headers:
+                headers_list.append((name, value))
         return self.status, headers_list, payload
 
 
+class Headers(Mapping[str, str]):
+    """Case-insensitive view of the request headers that reads environ on demand instead of copying it."""
+
+    __slots__ = ("_environ",)
+
+    def __init__(self, environ: dict[str, Any]):
+        self._environ = environ
+
+    @staticmethod
+    def _key(name: str) -> str:
+        key = name.upper().replace("-", "_")
+        return key if key in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{key}"
+
+    def __getitem__(self, name: str) -> str:
+        return self._environ[self._key(name)]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self._environ.get(self._key(name), default)
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self._key(name) in self._environ
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._environ:
+            if key.startswith("HTTP_") and key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                yield key[5:].replace("_", "-").title()
+            elif key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                yield key.replace("_", "-").title()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
 class Request:
+    __slots__ = ("environ", "method", "path", "query_string", "headers", "_json", "_body", "auth_context")
+
     def __init__(self, environ: dict[str, Any]):
         self.environ = environ
         self.method = environ["REQUEST_METHOD"].upper()
         self.path = environ.get("PATH_INFO", "")
         self.query_string = environ.get("QUERY_STRING", "")
-        self.headers = self._extract_headers(environ)
+        self.headers = Headers(environ)
         self._json: Optional[Any] = None
         self._body: Optional[bytes] = None
-
-    @staticmethod
-    def _extract_headers(environ: dict[str, Any]) -> dict[str, str]:
-        headers = {}
-        for key, value in environ.items():
-            if key.startswith("HTTP_"):
-                headers[key[5:].replace("_", "-").title()] = value
-        if "CONTENT_TYPE" in environ:
-            headers["Content-Type"] = environ["CONTENT_TYPE"]
-        if "CONTENT_LENGTH" in environ:
-            headers["Content-Length"] = environ["CONTENT_LENGTH"]
-        return headers
+        # Set by require_auth so later callers in the same request skip the token lookup.
+        self.auth_context: Optional[Any] = None
 
     def read_body(self) -> bytes:
         if self._body is None:
@@ -100,12 +145,19 @@ class Router:
         self.routes.append((method.upper(), pattern, handler))
 
     def match(self, method: str, path: str) -> tuple[Handler, dict[str, str]] | None:
+        resolved = self.resolve(method, path)
+        if resolved is None:
+            return None
+        _, handler, params = resolved
+        return handler, params
+
+    def resolve(self, method: str, path: str) -> tuple[str, Handler, dict[str, str]] | None:
         for route_method, pattern, handler in self.routes:
             if route_method != method.upper():
                 continue
             params = self._match_pattern(pattern, path)
             if params is not None:
-                return handler, params
+                return pattern, handler, params
         return None
 
     @staticmethod
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+from typing import Callable
+
+from .auth import require_auth
+from .config import settings
+from .db import db
+from .http import Request, Response, error_response
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# Stored with the headers of a bytes body, which JSON cannot hold, and dropped again on replay.
+BODY_ENCODING_HEADER = "Idempotent-Body-Encoding"
+
+logger = logging.getLogger("otj_u8s.idempotency")
+
+# Claims whose handler is still running; one thread keeps their leases from running out.
+_held_lock = threading.Lock()
+_held: set[tuple[int, str, str]] = set()
+_renewer: threading.Thread | None = None
+
+
+def _renew_leases() -> None:
+    while True:
+        time.sleep(settings.idempotency_lease_seconds / 3)
+        with _held_lock:
+            claims = list(_held)
+        if not claims:
+            continue
+        expires_at = (datetime.now(tz=timezone.utc) + timedelta(seconds=settings.idempotency_lease_seconds)).isoformat()
+        try:
+            db.executemany(
+                "UPDATE idempotency_keys SET expires_at = ? WHERE profile_id = ? AND idempotency_key = ? AND route = ? AND status IS NULL",
+                [(expires_at, *claim) for claim in claims],
+            )
+        except sqlite3.Error:
+            logger.exception("Could not renew %d idempotency leases", len(claims))
+
+
+def _hold(claim: tuple[int, str, str]) -> None:
+    global _renewer
+    with _held_lock:
+        _held.add(claim)
+        if _renewer is None:
+            _renewer = threading.Thread(target=_renew_leases, name="otj-idempotency-leases", daemon=True)
+            _renewer.start()
+
+
+def _release(claim: tuple[int, str, str]) -> None:
+    with _held_lock:
+        _held.discard(claim)
+
+
+def _request_hash(request: Request) -> str:
+    return hashlib.sha256(request.read_body()).hexdigest()
+
+
+def _replay(row: sqlite3.Row) -> Response:
+    headers = json.loads(row["headers"] or "{}")
+    body = json.loads(row["body"])
+    if headers.pop(BODY_ENCODING_HEADER, None) == "base64":
+        body = base64.b64decode(body)
+    headers["Idempotent-Replayed"] = "true"
+    return Response(status=row["status"], body=body, headers=headers)
+
+
+def with_idempotency(request: Request, handler: Callable[[], Response]) -> Response:
+    key = request.headers.get("Idempotency-Key")
+    if not key or request.method not in IDEMPOTENT_METHODS:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return error_response("Idempotency-Key too long")
+    auth = require_auth(request)
+    if isinstance(auth, Response):
+        return auth
+    route = f"{request.method} {request.path}"
+    request_hash = _request_hash(request)
+    started = datetime.now(tz=timezone.utc)
+    now = started.isoformat()
+    # The claim only holds for a short lease, renewed while the handler runs, so one left behind by a
+    # crashed process expires with the sweep below instead of answering 409 for the whole TTL.
+    lease_expires_at = (started + timedelta(seconds=settings.idempotency_lease_seconds)).isoformat()
+    db.execute("DELETE FROM idempotency_keys WHERE expires_at < ?", (now,))
+    # Claim the key before running the handler so a concurrent retry sees it in flight.
+    claimed = db.execute(
+        "INSERT OR IGNORE INTO idempotency_keys(profile_id, idempotency_key, route, request_hash, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (auth.profile_id, key, route, request_hash, now, lease_expires_at),
+    ).rowcount
+    if not claimed:
+        rows = db.query(
+            "SELECT * FROM idempotency_keys WHERE profile_id = ? AND idempotency_key = ? AND route = ?",
+            (auth.profile_id, key, route),
+        )
+        if rows:
+            row = rows[0]
+            if row["request_hash"] != request_hash:
+                return error_response("Idempotency-Key reused with a different payload", HTTPStatus.UNPROCESSABLE_ENTITY)
+            if row["status"] is None:
+                return error_response("Request with this Idempotency-Key is still in progress", HTTPStatus.CONFLICT)
+            return _replay(row)
+        return handler()
+    claim = (auth.profile_id, key, route)
+    _hold(claim)
+    try:
+        response = handler()
+    except Exception:
+        db.execute("DELETE FROM idempotency_keys WHERE profile_id = ? AND idempotency_key = ? AND route = ?", claim)
+        raise
+    finally:
+        _release(claim)
+    if response.status >= HTTPStatus.INTERNAL_SERVER_ERROR or response.file is not None:
+        # Server failures are not final; let the client retry for real. A streamed file cannot be stored.
+        db.execute("DELETE FROM idempotency_keys WHERE profile_id = ? AND idempotency_key = ? AND route = ?", claim)
+        return response
+    headers = dict(response.headers or {})
+    body = response.body
+    if isinstance(body, bytes):
+        headers[BODY_ENCODING_HEADER] = "base64"
+        body = base64.b64encode(body).decode("ascii")
+    expires_at = (datetime.now(tz=timezone.utc) + timedelta(hours=settings.idempotency_ttl_hours)).isoformat()
+    db.execute(
+        "UPDATE idempotency_keys SET status = ?, headers = ?, body = ?, expires_at = ? WHERE profile_id = ? AND idempotency_key = ? AND route = ?",
+        (int(response.status), json.dumps(headers), json.dumps(body), expires_at, *claim),
+    )
+    return response
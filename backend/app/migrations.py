@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+from .db import MIGRATIONS_DIR, MigrationError, current_timestamp, schema_version
+
+
+@dataclass
+class Migration:
+    version: str
+    path: Path
+
+    @property
+    def number(self) -> int:
+        return int(self.version.split("_", 1)[0])
+
+    @cached_property
+    def sql(self) -> str:
+        return self.path.read_text()
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+
+def apply_migrations(connection: sqlite3.Connection, directory: Path) -> None:
+    """Apply every file in directory not yet recorded; db.migrate_connection calls this only when behind."""
+    _ensure_schema_table(connection)
+    applied = {row[0]: row[1] for row in connection.execute("SELECT version, checksum FROM main.schema_migrations")}
+    migrations = discover_migrations(directory)
+    for migration in migrations:
+        if migration.version in applied:
+            recorded = applied[migration.version]
+            if recorded is None:
+                connection.execute("UPDATE main.schema_migrations SET checksum = ? WHERE version = ?", (migration.checksum, migration.version))
+                connection.commit()
+            elif recorded != migration.checksum:
+                raise MigrationError(f"Migration {migration.version} was modified after it was applied")
+            continue
+        _apply_migration(connection, migration)
+    latest = max((migration.number for migration in migrations), default=0)
+    if schema_version(connection) < latest:
+        connection.execute(f"PRAGMA main.user_version = {int(latest)}")
+        connection.commit()
+
+
+def _apply_migration(connection: sqlite3.Connection, migration: Migration) -> None:
+    # executescript commits any pending transaction first, so the explicit
+    # BEGIN/COMMIT makes the file, its bookkeeping row and user_version atomic.
+    script = "\n".join([
+        "BEGIN;",
+        migration.sql,
+        ";",
+        "INSERT INTO main.schema_migrations(version, applied_at, checksum) VALUES ({}, {}, {});".format(
+            _sql_literal(migration.version), _sql_literal(current_timestamp()), _sql_literal(migration.checksum)
+        ),
+        f"PRAGMA main.user_version = {int(migration.number)};",
+        "COMMIT;",
+    ])
+    try:
+        connection.executescript(script)
+    except sqlite3.Error as exc:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise MigrationError(f"Migration {migration.version} failed: {exc}") from exc
+
+
+def _ensure_schema_table(connection: sqlite3.Connection) -> None:
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS main.schema_migrations (version TEXT PRIMARY KEY, applied_at TEXT NOT NULL, checksum TEXT)"
+    )
+    columns = {row[1] for row in connection.execute("PRAGMA main.table_info(schema_migrations)")}
+    if "checksum" not in columns:
+        connection.execute("ALTER TABLE main.schema_migrations ADD COLUMN checksum TEXT")
+    connection.commit()
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    return [Migration(version=path.stem, path=path) for path in sorted(directory.glob("*.sql"))]
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import logging
+import marshal
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+from .config import settings
+from .db import TracedStatement, db
+from .http import Request, Response
+
+if TYPE_CHECKING:
+    import cProfile
+    import pstats
+
+logger = logging.getLogger("otj_u8s.slow")
+
+Route = tuple[str, str]
+
+
+@dataclass
+class RouteProfile:
+    remaining: int
+    profiled: int = 0
+    stats: pstats.Stats | None = None
+
+
+_profiles_lock = threading.Lock()
+_profiles: dict[Route, RouteProfile] = {}
+# cProfile hooks are process-wide in practice; only one request is profiled at a time.
+_profiler_busy = threading.Lock()
+
+
+@dataclass
+class RouteAllocations:
+    measured: int = 0
+    # Requests that ran while another request held the tracer, so were not measured.
+    skipped: int = 0
+    peak_total: int = 0
+    peak_max: int = 0
+    retained_total: int = 0
+    retained_max: int = 0
+
+
+_allocations_lock = threading.Lock()
+_allocations: dict[Route, RouteAllocations] = {}
+# tracemalloc's peak is process-wide, so only one request at a time is measured.
+_allocations_busy = threading.Lock()
+
+
+def arm_profiler(route: Route, requests: int) -> None:
+    with _profiles_lock:
+        _profiles[route] = RouteProfile(remaining=requests)
+
+
+def profiler_status() -> list[dict[str, Any]]:
+    with _profiles_lock:
+        return [
+            {"method": method, "route": pattern, "remaining": profile.remaining, "profiled": profile.profiled}
+            for (method, pattern), profile in _profiles.items()
+        ]
+
+
+def profile_stats(route: Route) -> bytes | None:
+    with _profiles_lock:
+        profile = _profiles.get(route)
+        if profile is None or profile.stats is None:
+            return None
+        # Same format pstats.Stats.dump_stats writes, so the download loads with pstats/snakeviz.
+        return marshal.dumps(profile.stats.stats)
+
+
+def _claim(route: Route | None) -> bool:
+    if route is None:
+        return False
+    with _profiles_lock:
+        profile = _profiles.get(route)
+        if profile is None or profile.remaining <= 0:
+            return False
+        if not _profiler_busy.acquire(blocking=False):
+            return False
+        profile.remaining -= 1
+        return True
+
+
+def _collect(route: Route, profiler: cProfile.Profile) -> None:
+    with _profiles_lock:
+        profile = _profiles.get(route)
+        if profile is None:
+            return
+        if profile.stats is None:
+            import pstats
+
+            profile.stats = pstats.Stats(profiler)
+        else:
+            profile.stats.add(profiler)
+        profile.profiled += 1
+
+
+def _claim_allocations(route: Route | None) -> bool:
+    if route is None or not settings.trace_allocations:
+        return False
+    if _allocations_busy.acquire(blocking=False):
+        return True
+    with _allocations_lock:
+        _allocations.setdefault(route, RouteAllocations()).skipped += 1
+    return False
+
+
+def _measure_allocations(route: Route, call: Callable[[], Response]) -> Response:
+    # tracemalloc loads, and starts tracing, only when TRACE_ALLOCATIONS is on.
+    import tracemalloc
+
+    try:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            return call()
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            with _allocations_lock:
+                allocations = _allocations.setdefault(route, RouteAllocations())
+                allocations.measured += 1
+                allocations.peak_total += peak - before
+                allocations.peak_max = max(allocations.peak_max, peak - before)
+                allocations.retained_total += current - before
+                allocations.retained_max = max(allocations.retained_max, current - before)
+    finally:
+        _allocations_busy.release()
+
+
+def allocation_report() -> dict[str, Any]:
+    """Per-route bytes allocated above the pre-request baseline (peak) and still held afterwards (retained)."""
+    traced = None
+    if settings.trace_allocations:
+        import tracemalloc
+
+        if tracemalloc.is_tracing():
+            traced = tracemalloc.get_traced_memory()[0]
+    with _allocations_lock:
+        routes = [
+            {
+                "method": method,
+                "route": pattern,
+                "measured": allocations.measured,
+                "skipped": allocations.skipped,
+                "mean_peak_bytes": allocations.peak_total // allocations.measured if allocations.measured else None,
+                "max_peak_bytes": allocations.peak_max,
+                "mean_retained_bytes": allocations.retained_total // allocations.measured if allocations.measured else None,
+                "max_retained_bytes": allocations.retained_max,
+            }
+            for (method, pattern), allocations in _allocations.items()
+        ]
+    routes.sort(key=lambda item: item["mean_peak_bytes"] or 0, reverse=True)
+    return {"enabled": settings.trace_allocations, "traced_bytes": traced, "routes": routes}
+
+
+def _explain(statement: TracedStatement) -> list[str]:
+    try:
+        rows = statement.connection.execute(f"EXPLAIN QUERY PLAN {statement.sql}", statement.params).fetchall()
+    except sqlite3.Error as exc:
+        return [f"unavailable: {exc}"]
+    return [row[3] for row in rows]
+
+
+def _log_slow(request: Request, route: Route | None, params: dict[str, str], response: Response | None, elapsed_ms: float, statements: list[TracedStatement]) -> None:
+    slowest = max(statements, key=lambda statement: statement.elapsed_ms, default=None)
+    # SQL parameters are left out of the log: they can hold tokens and emails.
+    entry = {
+        "method": request.method,
+        "route": route[1] if route else request.path,
+        "params": params,
+        "query": sorted(request.query()),
+        "status": int(response.status) if response is not None else None,
+        "elapsed_ms": round(elapsed_ms, 1),
+        "sql": [{"ms": round(statement.elapsed_ms, 2), "sql": statement.sql} for statement in statements],
+        "slowest_plan": _explain(slowest) if slowest is not None else [],
+    }
+    logger.warning("Slow request %s", json.dumps(entry))
+
+
+def observe(request: Request, route: Route | None, params: dict[str, str], call: Callable[[], Response]) -> Response:
+    profiling = _claim(route)
+    response: Response | None = None
+    with db.trace_statements() as statements:
+        started = time.perf_counter()
+        try:
+            if profiling:
+                # cProfile and pstats load only once a route is actually armed for profiling.
+                import cProfile
+
+                profiler = cProfile.Profile()
+                try:
+                    response = profiler.runcall(call)
+                finally:
+                    _collect(route, profiler)
+                    _profiler_busy.release()
+            elif _claim_allocations(route):
+                response = _measure_allocations(route, call)
+            else:
+                response = call()
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if settings.slow_request_ms and elapsed_ms >= settings.slow_request_ms:
+                _log_slow(request, route, params, response, elapsed_ms, statements)
+    return response
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import argparse
+import ast
+import re
+import sqlite3
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import settings
+from .db import ARCHIVE_MIGRATIONS_DIR, ARCHIVE_SCHEMA_VERSION, Database, migrate_connection
+
+APP_DIR = Path(__file__).parent
+AUDITED_PATHS = ("routes", "services", "auth.py")
+DB_METHODS = {"query", "cached_query", "execute", "executemany"}
+
+# Statements whose scans are expected: the plan is reported but does not fail the audit.
+# Keys are whitespace-normalised SQL text.
+ACCEPTED_PLANS: dict[str, str] = {
+    # Parent-key inserts plan child scans that only run while a deferred FK violation is pending.
+    "INSERT INTO profiles(email, display_name, phone, guardian_name, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)": "deferred FK check, never taken",
+    # The attendance repair command walks every team on purpose.
+    "SELECT id FROM teams ORDER BY id": "offline rebuild",
+    # Ranked search sorts the matching rows by bm25 score; the match itself uses the FTS index.
+    "SELECT team_members.id, team_members.role, profiles.display_name, profiles.email, profiles.guardian_name, bm25(profiles_fts, 10.0, 5.0, 2.0) AS score FROM profiles_fts JOIN team_members ON team_members.profile_id = profiles_fts.rowid AND team_members.team_id = ? JOIN profiles ON profiles.id = profiles_fts.rowid WHERE profiles_fts MATCH ? ORDER BY score LIMIT ?": "bm25 ranking",
+    "SELECT sessions.id, sessions.title, sessions.location, sessions.start_at, sessions.end_at, bm25(sessions_fts, 0.0, 10.0, 4.0, 1.0) AS score FROM sessions_fts JOIN sessions ON sessions.id = sessions_fts.rowid WHERE sessions_fts MATCH ? ORDER BY score LIMIT ?": "bm25 ranking",
+    "SELECT invites.id, invites.email, invites.role, invites.expires_at, invites.accepted_at, bm25(invites_fts, 0.0, 5.0) AS score FROM invites_fts JOIN invites ON invites.id = invites_fts.rowid WHERE invites_fts MATCH ? ORDER BY score LIMIT ?": "bm25 ranking",
+}
+# FTS5 reports an index lookup as "SCAN <table> VIRTUAL TABLE INDEX n:M..." when MATCH drives it.
+FTS_MATCH_PLAN = re.compile(r"^SCAN \w+ VIRTUAL TABLE INDEX \d+:M")
+
+
+@dataclass
+class Statement:
+    location: str
+    sql: str
+    plan: list[str] = field(default_factory=list)
+    problems: list[str] = field(default_factory=list)
+
+    @property
+    def accepted(self) -> bool:
+        return normalize_sql(self.sql) in ACCEPTED_PLANS
+
+
+def normalize_sql(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _audited_files() -> list[Path]:
+    files: list[Path] = []
+    for entry in AUDITED_PATHS:
+        path = APP_DIR / entry
+        files.extend(sorted(path.glob("*.py")) if path.is_dir() else [path])
+    return files
+
+
+def collect_statements() -> tuple[list[Statement], list[str]]:
+    statements: list[Statement] = []
+    skipped: list[str] = []
+    for path in _audited_files():
+        tree = ast.parse(path.read_text(), filename=str(path))
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in DB_METHODS):
+                continue
+            if not (isinstance(node.func.value, ast.Name) and node.func.value.id == "db") or not node.args:
+                continue
+            location = f"{path.relative_to(APP_DIR.parent)}:{node.lineno}"
+            argument = node.args[0]
+            if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+                statements.append(Statement(location=location, sql=argument.value))
+            else:
+                skipped.append(location)
+    return statements, skipped
+
+
+def explain(connection: sqlite3.Connection, statement: Statement) -> None:
+    params = tuple(1 for _ in range(statement.sql.count("?")))
+    rows = connection.execute(f"EXPLAIN QUERY PLAN {statement.sql}", params).fetchall()
+    statement.plan = [row[3] for row in rows]
+    for detail in statement.plan:
+        # "SCAN ... USING INDEX" still walks the whole index; only SEARCH is bounded.
+        if detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW" and not FTS_MATCH_PLAN.match(detail):
+            statement.problems.append(f"full scan: {detail}")
+        elif "TEMP B-TREE" in detail:
+            statement.problems.append(f"temp b-tree: {detail}")
+
+
+def unindexed_foreign_keys(connection: sqlite3.Connection) -> list[str]:
+    # Cascading deletes look up child rows by the referencing column, which scans
+    # the child table unless an index starts with that column.
+    missing = []
+    tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        leading_columns = set()
+        for index in connection.execute(f"PRAGMA index_list({table})").fetchall():
+            columns = connection.execute(f"PRAGMA index_info({index[1]})").fetchall()
+            if columns:
+                leading_columns.add(columns[0][2])
+        for foreign_key in connection.execute(f"PRAGMA foreign_key_list({table})").fetchall():
+            column = foreign_key[3]
+            if column not in leading_columns:
+                missing.append(f"{table}.{column} -> {foreign_key[2]}")
+    return missing
+
+
+def audit(database_path: str, analyze: bool = False) -> tuple[list[Statement], list[str], list[str]]:
+    database = Database(database_path)
+    database.migrate()
+    if analyze:
+        database.connection.execute("ANALYZE")
+    statements, skipped = collect_statements()
+    with tempfile.TemporaryDirectory() as directory:
+        # An empty archive stands in for DATABASE_ARCHIVE_PATH so history queries can be planned.
+        archive_path = str(Path(directory) / "archive.db")
+        archive = sqlite3.connect(archive_path)
+        migrate_connection(archive, ARCHIVE_MIGRATIONS_DIR, ARCHIVE_SCHEMA_VERSION)
+        archive.close()
+        database.connection.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        for statement in statements:
+            explain(database.connection, statement)
+        foreign_keys = unindexed_foreign_keys(database.connection)
+        database.close()
+    return statements, skipped, foreign_keys
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run EXPLAIN QUERY PLAN over every SQL statement used by the API")
+    parser.add_argument("--database", default=settings.database_path, help="Database to plan against (ideally one loaded with seed.py --scale)")
+    parser.add_argument("--analyze", action="store_true", help="Run ANALYZE first so plans reflect table statistics")
+    parser.add_argument("--verbose", action="store_true", help="Print plans for every statement, not just flagged ones")
+    args = parser.parse_args(argv)
+    statements, skipped, foreign_keys = audit(args.database, analyze=args.analyze)
+    failures = 0
+    for statement in statements:
+        if not statement.problems and not args.verbose:
+            continue
+        if statement.problems and statement.accepted:
+            status = "ACCEPTED"
+        elif statement.problems:
+            status = "FAIL"
+            failures += 1
+        else:
+            status = "OK"
+        print(f"[{status}] {statement.location}: {normalize_sql(statement.sql)}")
+        for detail in statement.plan:
+            print(f"    {detail}")
+    for foreign_key in foreign_keys:
+        print(f"[WARN] foreign key without index: {foreign_key}")
+    for location in skipped:
+        print(f"[SKIPPED] {location}: dynamic SQL cannot be planned statically")
+    print(f"{len(statements)} statements planned, {failures} regressions, {len(skipped)} skipped")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
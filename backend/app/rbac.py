@@ -26,3 +26,7 @@ def role_allows_rsvp_management(role: str) -> bool:
 
 def role_can_manage_members(role: str) -> bool:
     return role == "manager"
+
+
+def role_can_view_attendance(role: str) -> bool:
+    return role in {"manager", "coach"}
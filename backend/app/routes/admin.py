@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hmac
+import logging
+import threading
+from http import HTTPStatus
+from typing import Any
+
+from ..backup import create_backup, default_backup_path
+from ..config import settings
+from ..db import current_timestamp, db
+from ..http import Request, Response, error_response, json_response
+from ..profiling import allocation_report, arm_profiler, profile_stats, profiler_status
+
+logger = logging.getLogger("otj_u8s.admin")
+
+_backup_lock = threading.Lock()
+_backup_state: dict[str, Any] = {"status": "idle"}
+
+
+def require_internal(request: Request) -> Response | None:
+    expected = settings.internal_api_token
+    if not expected:
+        return error_response("Internal API disabled", HTTPStatus.NOT_FOUND)
+    provided = request.headers.get("X-Internal-Token") or ""
+    if not hmac.compare_digest(provided.encode("utf-8"), expected.encode("utf-8")):
+        return error_response("Invalid internal token", HTTPStatus.FORBIDDEN)
+    return None
+
+
+def _run_backup(target: str, compress: bool) -> None:
+    try:
+        result = create_backup(target, compress=compress)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.exception("Backup to %s failed", target)
+        with _backup_lock:
+            _backup_state.update({"status": "failed", "error": str(exc), "finished_at": current_timestamp()})
+        return
+    with _backup_lock:
+        _backup_state.update({"status": "completed", "result": result, "finished_at": current_timestamp()})
+
+
+def start_backup(request: Request) -> Response:
+    denied = require_internal(request)
+    if denied is not None:
+        return denied
+    try:
+        payload = request.json()
+    except ValueError as exc:
+        return error_response(str(exc))
+    compress = bool(payload.get("compress"))
+    target = default_backup_path(compress)
+    with _backup_lock:
+        if _backup_state.get("status") == "running":
+            return error_response("Backup already running", HTTPStatus.CONFLICT)
+        _backup_state.clear()
+        _backup_state.update({"status": "running", "target": target, "started_at": current_timestamp()})
+    # Backups step through the file with pauses, so run them off the request thread.
+    threading.Thread(target=_run_backup, args=(target, compress), name="otj-backup", daemon=True).start()
+    return json_response({"status": "running", "target": target}, status=HTTPStatus.ACCEPTED)
+
+
+def backup_status(request: Request) -> Response:
+    denied = require_internal(request)
+    if denied is not None:
+        return denied
+    with _backup_lock:
+        return json_response(dict(_backup_state))
+
+
+def query_cache_status(request: Request) -> Response:
+    denied = require_internal(request)
+    if denied is not None:
+        return denied
+    return json_response(db.cache_stats())
+
+
+def allocation_status(request: Request) -> Response:
+    denied = require_internal(request)
+    if denied is not None:
+        return denied
+    return json_response(allocation_report())
+
+
+def start_profiling(request: Request) -> Response:
+    denied = require_internal(request)
+    if denied is not None:
+        return denied
+    try:
+        payload = request.json()
+    except ValueError as exc:
+        return error_response(str(exc))
+    method = str(payload.get("method", "GET")).upper()
+    route = payload.get("route")
+    try:
+        requests = int(payload.get("requests", 10))
+    except (TypeError, ValueError):
+        return error_response("requests must be an integer")
+    if not route or requests <= 0:
+        return error_response("route and a positive requests count are required")
+    arm_profiler((method, route), requests)
+    return json_response({"status": "armed", "method": method, "route": route, "requests": requests}, status=HTTPStatus.ACCEPTED)
+
+
+def profiling_status(request: Request) -> Response:
+    denied = require_internal(request)
+    if denied is not None:
+        return denied
+    return json_response({"profiles": profiler_status()})
+
+
+def download_profile(request: Request) -> Response:
+    denied = require_internal(request)
+    if denied is not None:
+        return denied
+    query = request.query()
+    method = (query.get("method") or ["GET"])[0].upper()
+    route = (query.get("route") or [""])[0]
+    data = profile_stats((method, route))
+    if data is None:
+        return error_response("No profile collected for this route", HTTPStatus.NOT_FOUND)
+    return Response(
+        status=HTTPStatus.OK,
+        body=data,
+        headers={"Content-Disposition": 'attachment; filename="otj-u8s.pstats"'},
+    )
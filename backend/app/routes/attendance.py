@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from http import HTTPStatus
+
+from ..auth import require_auth
+from ..db import db
+from ..http import Request, Response, error_response, json_response
+from ..rbac import role_can_view_attendance
+from ..services.attendance import STATUSES, current_season
+
+
+def get_attendance(request: Request, team_id: int) -> Response:
+    auth = require_auth(request)
+    if isinstance(auth, Response):
+        return auth
+    role = auth.memberships.get(team_id)
+    if not role or not role_can_view_attendance(role):
+        return error_response("Managers and coaches only", HTTPStatus.FORBIDDEN)
+    try:
+        season = int(request.query().get("season", [current_season()])[0])
+    except ValueError:
+        return error_response("Invalid season")
+    season_rows = db.query("SELECT session_count FROM attendance_seasons WHERE team_id = ? AND season = ?", (team_id, season))
+    session_count = season_rows[0]["session_count"] if season_rows else 0
+    rows = db.query(
+        "SELECT team_members.profile_id, team_members.role, profiles.display_name, profiles.email, attendance_stats.yes_count, attendance_stats.no_count, attendance_stats.maybe_count, attendance_stats.pending_count, attendance_stats.current_streak FROM team_members JOIN profiles ON profiles.id = team_members.profile_id LEFT JOIN attendance_stats ON attendance_stats.team_id = team_members.team_id AND attendance_stats.season = ? AND attendance_stats.profile_id = team_members.profile_id WHERE team_members.team_id = ?",
+        (season, team_id),
+    )
+    players = []
+    for row in rows:
+        counts = {status: row[f"{status}_count"] or 0 for status in STATUSES}
+        players.append({
+            "profile_id": row["profile_id"],
+            "role": row["role"],
+            "display_name": row["display_name"],
+            "email": row["email"],
+            **counts,
+            "no_response": max(0, session_count - sum(counts.values())),
+            "attendance_rate": round(counts["yes"] / session_count, 3) if session_count else None,
+            "current_streak": row["current_streak"] or 0,
+        })
+    return json_response({"season": season, "sessions": session_count, "players": players})
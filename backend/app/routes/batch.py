@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any
+
+from .. import admission
+from ..auth import AuthContext, require_auth
+from ..config import settings
+from ..http import Request, Response, error_response, json_response, router
+from ..idempotency import with_idempotency
+
+logger = logging.getLogger("otj_u8s.batch")
+
+# Request headers an item may set for itself; everything else comes from the batch request.
+ITEM_HEADERS = ("Idempotency-Key",)
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.batch_max_workers, thread_name_prefix="otj-batch")
+        return _executor
+
+
+def _build_subrequest(parent: Request, item: dict[str, Any], auth: AuthContext) -> Request:
+    path, _, query_string = str(item.get("path", "")).partition("?")
+    body = b"" if item.get("body") is None else json.dumps(item["body"]).encode("utf-8")
+    environ = dict(parent.environ)
+    # The batch's own Idempotency-Key covers the batch response, not each item.
+    environ.pop("HTTP_IDEMPOTENCY_KEY", None)
+    headers = item.get("headers") if isinstance(item.get("headers"), dict) else {}
+    for name in ITEM_HEADERS:
+        if headers.get(name) is not None:
+            environ["HTTP_" + name.upper().replace("-", "_")] = str(headers[name])
+    environ.update({
+        "REQUEST_METHOD": str(item.get("method", "GET")).upper(),
+        "PATH_INFO": path,
+        "QUERY_STRING": query_string,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+    })
+    subrequest = Request(environ)
+    subrequest.auth_context = auth
+    return subrequest
+
+
+def _dispatch(subrequest: Request) -> dict[str, Any]:
+    """Run one item through the same rate limits and Idempotency-Key handling as server.dispatch.
+
+    The batch already holds a slot in the concurrency gate, so items do not queue for another.
+    """
+    resolved = router.resolve(subrequest.method, subrequest.path)
+    route = (subrequest.method, resolved[0]) if resolved is not None else None
+    if route == ("POST", "/batch"):
+        response = error_response("Nested batches are not allowed")
+    else:
+        response = admission.check_rate_limits(subrequest, route)
+        if response is None and resolved is None:
+            response = error_response("Not found", HTTPStatus.NOT_FOUND)
+        elif response is None:
+            _, handler, params = resolved
+            try:
+                response = with_idempotency(subrequest, lambda: handler(subrequest, **params))
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Unhandled error in batch item: %s", exc)
+                response = error_response("Server error", HTTPStatus.INTERNAL_SERVER_ERROR)
+    return {"status": int(response.status), "headers": response.headers or {}, "body": response.body}
+
+
+def handle_batch(request: Request) -> Response:
+    auth = require_auth(request)
+    if isinstance(auth, Response):
+        return auth
+    try:
+        payload = request.json()
+    except ValueError as exc:
+        return error_response(str(exc))
+    items = payload.get("requests")
+    if not isinstance(items, list) or not items:
+        return error_response("requests must be a non-empty list")
+    if len(items) > settings.batch_max_requests:
+        return error_response(f"At most {settings.batch_max_requests} requests per batch")
+    if not all(isinstance(item, dict) and item.get("path") for item in items):
+        return error_response("Each request needs a method and path")
+    subrequests = [_build_subrequest(request, item, auth) for item in items]
+    # Only a batch made entirely of reads is safe to fan out: writes keep their order.
+    if payload.get("concurrent") and all(subrequest.method == "GET" for subrequest in subrequests):
+        responses = list(_get_executor().map(_dispatch, subrequests))
+    else:
+        responses = [_dispatch(subrequest) for subrequest in subrequests]
+    return json_response({"responses": responses})
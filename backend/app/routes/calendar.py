@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+
+from ..auth import AuthError, require_auth, sign_payload, verify_token
+from ..config import settings
+from ..db import current_timestamp, db, row_to_dict
+from ..http import Request, Response, error_response, json_response
+from ..services.calendar import cached_calendar, render_calendar, store_calendar, team_stamp
+
+# Validated feed tokens, keyed by inner token value, so calendar polls skip the
+# token table once a subscription has been seen by this process. Entries expire after
+# FEED_TOKEN_CACHE_SECONDS so a revocation made by another worker is picked up.
+_feed_token_lock = threading.Lock()
+_feed_tokens: dict[str, tuple[int, int, float]] = {}
+
+
+def forget_feed_tokens(team_id: int, profile_id: int | None = None) -> None:
+    with _feed_token_lock:
+        for raw_token, (token_team_id, token_profile_id, _) in list(_feed_tokens.items()):
+            if token_team_id == team_id and (profile_id is None or token_profile_id == profile_id):
+                del _feed_tokens[raw_token]
+
+
+def _resolve_feed_token(token: str, team_id: int) -> int | None:
+    try:
+        payload = verify_token(token)
+    except (AuthError, ValueError):
+        return None
+    raw_token = payload.get("feed")
+    if not raw_token or payload.get("team_id") != team_id:
+        return None
+    with _feed_token_lock:
+        cached = _feed_tokens.get(raw_token)
+    if cached is not None and time.monotonic() - cached[2] < settings.feed_token_cache_seconds:
+        return cached[1] if cached[0] == team_id else None
+    rows = db.query(
+        "SELECT calendar_feed_tokens.profile_id FROM calendar_feed_tokens JOIN team_members ON team_members.team_id = calendar_feed_tokens.team_id AND team_members.profile_id = calendar_feed_tokens.profile_id WHERE calendar_feed_tokens.token = ? AND calendar_feed_tokens.team_id = ? AND calendar_feed_tokens.revoked_at IS NULL",
+        (raw_token, team_id),
+    )
+    if not rows:
+        return None
+    profile_id = rows[0]["profile_id"]
+    with _feed_token_lock:
+        _feed_tokens[raw_token] = (team_id, profile_id, time.monotonic())
+    return profile_id
+
+
+def create_feed(request: Request, team_id: int) -> Response:
+    auth = require_auth(request)
+    if isinstance(auth, Response):
+        return auth
+    if team_id not in auth.memberships:
+        return error_response("Team access denied", HTTPStatus.FORBIDDEN)
+    raw_token = secrets.token_urlsafe(32)
+    db.execute(
+        "INSERT INTO calendar_feed_tokens(team_id, profile_id, token, created_at) VALUES (?, ?, ?, ?)",
+        (team_id, auth.profile_id, raw_token, current_timestamp()),
+    )
+    token = sign_payload({"feed": raw_token, "team_id": team_id})
+    feed_url = f"{settings.base_url}/teams/{team_id}/calendar.ics?token={token}"
+    return json_response({"token": token, "url": feed_url}, status=HTTPStatus.CREATED)
+
+
+def revoke_feeds(request: Request, team_id: int) -> Response:
+    auth = require_auth(request)
+    if isinstance(auth, Response):
+        return auth
+    if team_id not in auth.memberships:
+        return error_response("Team access denied", HTTPStatus.FORBIDDEN)
+    db.execute(
+        "UPDATE calendar_feed_tokens SET revoked_at = ? WHERE team_id = ? AND profile_id = ? AND revoked_at IS NULL",
+        (current_timestamp(), team_id, auth.profile_id),
+    )
+    forget_feed_tokens(team_id, auth.profile_id)
+    return json_response({"status": "revoked"})
+
+
+def _not_modified(request: Request, etag: str, last_modified: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        candidates = {item.strip() for item in if_none_match.split(",")}
+        return etag in candidates or "*" in candidates
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def get_calendar(request: Request, team_id: int) -> Response:
+    token = (request.query().get("token") or [""])[0]
+    if not token or _resolve_feed_token(token, team_id) is None:
+        return error_response("Invalid calendar token", HTTPStatus.UNAUTHORIZED)
+    stamp = team_stamp(team_id)
+    rendered = cached_calendar(team_id, stamp)
+    if rendered is None:
+        team_rows = db.query("SELECT name FROM teams WHERE id = ?", (team_id,))
+        if not team_rows:
+            return error_response("Team not found", HTTPStatus.NOT_FOUND)
+        rows = db.query("SELECT * FROM sessions WHERE team_id = ? ORDER BY start_at", (team_id,))
+        body = render_calendar(team_rows[0]["name"], [row_to_dict(row) for row in rows])
+        rendered = store_calendar(team_id, stamp, body)
+    headers = {
+        "ETag": rendered.etag,
+        "Last-Modified": rendered.last_modified,
+        "Cache-Control": "private, no-cache",
+    }
+    if _not_modified(request, rendered.etag, rendered.last_modified):
+        return Response(status=HTTPStatus.NOT_MODIFIED, body=None, headers=headers)
+    headers["Content-Type"] = "text/calendar; charset=utf-8"
+    headers["Content-Disposition"] = f'inline; filename="team-{team_id}.ics"'
+    return Response(status=HTTPStatus.OK, body=rendered.body, headers=headers)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from http import HTTPStatus
+
+from ..assets import INDEX_FILE, Asset, load_assets
+from ..http import Request, Response, error_response
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def _serve(request: Request, asset: Asset, cache_control: str) -> Response:
+    path, encoding = asset.select(request.headers.get("Accept-Encoding") or "")
+    # Each encoded variant is a distinct representation, so it gets its own validator.
+    etag = asset.etag if encoding is None else f'{asset.etag[:-1]}-{encoding}"'
+    headers = {
+        "Content-Type": asset.content_type,
+        "Cache-Control": cache_control,
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+    }
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+        return Response(status=HTTPStatus.NOT_MODIFIED, body=None, headers=headers)
+    headers["Content-Length"] = str(path.stat().st_size)
+    return Response(status=HTTPStatus.OK, body=None, headers=headers, file=path.open("rb"))
+
+
+def get_index(request: Request) -> Response:
+    # index.html keeps its name, so it is revalidated on every visit; what it references never changes.
+    return _serve(request, load_assets()[INDEX_FILE], REVALIDATE)
+
+
+def get_asset(request: Request, asset: str) -> Response:
+    found = load_assets().get(asset)
+    if found is None or asset == INDEX_FILE:
+        return error_response("Not found", HTTPStatus.NOT_FOUND)
+    return _serve(request, found, IMMUTABLE)
@@ -5,6 +5,7 @@ from ..auth import require_auth
 from ..db import current_timestamp, db, row_to_dict
 from ..http import Request, Response, error_response, json_response
 from ..services.activity import log_action
+from ..services.attendance import record_rsvp
 from ..services.notifications import send_email
 from ..utils.time import parse_iso8601, utc_now
 from .sessions import session_is_locked
@@ -22,6 +23,11 @@ def list_rsvps(request: Request, team_id: int, session_id: int) -> Response:
         "SELECT rsvps.*, profiles.display_name, profiles.email FROM rsvps JOIN profiles ON profiles.id = rsvps.profile_id JOIN sessions ON sessions.id = rsvps.session_id WHERE sessions.team_id = ? AND sessions.id = ?",
         (team_id, session_id),
     )
+    if not rows and db.has_archive():
+        rows = db.query(
+            "SELECT rsvps.*, profiles.display_name, profiles.email FROM archive.rsvps AS rsvps JOIN profiles ON profiles.id = rsvps.profile_id JOIN archive.sessions AS sessions ON sessions.id = rsvps.session_id WHERE sessions.team_id = ? AND sessions.id = ?",
+            (team_id, session_id),
+        )
     items = [row_to_dict(row) for row in rows]
     return json_response({"rsvps": items})
 
@@ -33,7 +39,7 @@ def upsert_rsvp(request: Request, team_id: int, session_id: int, target_profile_
     role = auth.memberships.get(team_id)
     if not role:
         return error_response("Team access denied", HTTPStatus.FORBIDDEN)
-    session_rows = db.query("SELECT * FROM sessions WHERE id = ? AND team_id = ?", (session_id, team_id))
+    session_rows = db.cached_query("SELECT * FROM sessions WHERE id = ? AND team_id = ?", (session_id, team_id))
     if not session_rows:
         return error_response("Session not found", HTTPStatus.NOT_FOUND)
     session = row_to_dict(session_rows[0])
@@ -51,25 +57,28 @@ def upsert_rsvp(request: Request, team_id: int, session_id: int, target_profile_
         target_profile_id = auth.profile_id
     elif target_profile_id != auth.profile_id and role != "manager":
         return error_response("Managers may update other RSVPs only", HTTPStatus.FORBIDDEN)
-    existing = db.query("SELECT * FROM rsvps WHERE session_id = ? AND profile_id = ?", (session_id, target_profile_id))
     now = current_timestamp()
-    if existing:
-        db.execute(
-            "UPDATE rsvps SET status = ?, note = ?, updated_at = ? WHERE id = ?",
-            (status, note, now, existing[0]["id"]),
-        )
-        action = "updated"
-    else:
-        db.execute(
-            "INSERT INTO rsvps(session_id, profile_id, status, note, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (session_id, target_profile_id, status, note, now, now),
-        )
-        action = "created"
+    with db.transaction():
+        # Read inside the transaction so two concurrent first answers cannot both insert.
+        existing = db.query("SELECT * FROM rsvps WHERE session_id = ? AND profile_id = ?", (session_id, target_profile_id))
+        if existing:
+            db.execute(
+                "UPDATE rsvps SET status = ?, note = ?, updated_at = ? WHERE id = ?",
+                (status, note, now, existing[0]["id"]),
+            )
+            action = "updated"
+        else:
+            db.execute(
+                "INSERT INTO rsvps(session_id, profile_id, status, note, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, target_profile_id, status, note, now, now),
+            )
+            action = "created"
+        record_rsvp(team_id, target_profile_id, session["start_at"], existing[0]["status"] if existing else None, status)
     log_action(team_id, auth.profile_id, action, "rsvp", session_id, {"status": status, "profile_id": target_profile_id})
     send_email(
         subject=f"RSVP {action}",
         body=f"RSVP for session {session.get('title')} set to {status}",
-        recipients=[member["email"] for member in db.query(
+        recipients=[member["email"] for member in db.cached_query(
             "SELECT profiles.email FROM team_members JOIN profiles ON profiles.id = team_members.profile_id WHERE team_members.team_id = ? AND team_members.role = 'manager'",
             (team_id,),
         ) if member["email"]],
@@ -86,6 +95,14 @@ def delete_rsvp(request: Request, team_id: int, session_id: int, profile_id: int
         return error_response("Team access denied", HTTPStatus.FORBIDDEN)
     if profile_id != auth.profile_id and role != "manager":
         return error_response("Managers may remove other RSVPs only", HTTPStatus.FORBIDDEN)
-    db.execute("DELETE FROM rsvps WHERE session_id = ? AND profile_id = ?", (session_id, profile_id))
+    with db.transaction():
+        # Read inside the transaction so concurrent duplicate deletes count the answer only once.
+        existing = db.query(
+            "SELECT rsvps.status, sessions.start_at FROM rsvps JOIN sessions ON sessions.id = rsvps.session_id WHERE rsvps.session_id = ? AND rsvps.profile_id = ? AND sessions.team_id = ?",
+            (session_id, profile_id, team_id),
+        )
+        deleted = db.execute("DELETE FROM rsvps WHERE session_id = ? AND profile_id = ?", (session_id, profile_id)).rowcount
+        if existing and deleted == 1:
+            record_rsvp(team_id, profile_id, existing[0]["start_at"], existing[0]["status"], None)
     log_action(team_id, auth.profile_id, "deleted", "rsvp", session_id, {"profile_id": profile_id})
     return json_response({"status": "deleted"})
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import heapq
+import re
+from http import HTTPStatus
+from typing import Any
+
+from ..auth import require_auth
+from ..db import db
+from ..http import Request, Response, error_response, json_response
+from ..rbac import role_can_manage_members
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 8
+SEARCH_TYPES = ("member", "session", "invite")
+
+
+def build_match_query(text: str) -> str | None:
+    # Every word becomes a quoted prefix term, so user input can never be parsed as FTS5 syntax.
+    terms = re.findall(r"\w+", text)[:MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _int_param(query: dict[str, list[str]], name: str, default: int) -> int:
+    try:
+        return max(0, int(query.get(name, [default])[0]))
+    except ValueError:
+        return default
+
+
+def _search_members(team_id: int, match: str, count: int) -> list[dict[str, Any]]:
+    rows = db.query(
+        "SELECT team_members.id, team_members.role, profiles.display_name, profiles.email, profiles.guardian_name, bm25(profiles_fts, 10.0, 5.0, 2.0) AS score FROM profiles_fts JOIN team_members ON team_members.profile_id = profiles_fts.rowid AND team_members.team_id = ? JOIN profiles ON profiles.id = profiles_fts.rowid WHERE profiles_fts MATCH ? ORDER BY score LIMIT ?",
+        (team_id, match, count),
+    )
+    return [{"type": "member", **dict(row)} for row in rows]
+
+
+def _search_sessions(team_id: int, match: str, count: int) -> list[dict[str, Any]]:
+    rows = db.query(
+        "SELECT sessions.id, sessions.title, sessions.location, sessions.start_at, sessions.end_at, bm25(sessions_fts, 0.0, 10.0, 4.0, 1.0) AS score FROM sessions_fts JOIN sessions ON sessions.id = sessions_fts.rowid WHERE sessions_fts MATCH ? ORDER BY score LIMIT ?",
+        (f'team_id : "{team_id}" AND {{title location description}} : ({match})', count),
+    )
+    return [{"type": "session", **dict(row)} for row in rows]
+
+
+def _search_invites(team_id: int, match: str, count: int) -> list[dict[str, Any]]:
+    rows = db.query(
+        "SELECT invites.id, invites.email, invites.role, invites.expires_at, invites.accepted_at, bm25(invites_fts, 0.0, 5.0) AS score FROM invites_fts JOIN invites ON invites.id = invites_fts.rowid WHERE invites_fts MATCH ? ORDER BY score LIMIT ?",
+        (f'team_id : "{team_id}" AND email : ({match})', count),
+    )
+    return [{"type": "invite", **dict(row)} for row in rows]
+
+
+def search_team(request: Request, team_id: int) -> Response:
+    auth = require_auth(request)
+    if isinstance(auth, Response):
+        return auth
+    role = auth.memberships.get(team_id)
+    if role is None:
+        return error_response("Team access denied", HTTPStatus.FORBIDDEN)
+    query = request.query()
+    match = build_match_query(query.get("q", [""])[0])
+    if match is None:
+        return error_response("q is required")
+    limit = min(_int_param(query, "limit", DEFAULT_LIMIT) or DEFAULT_LIMIT, MAX_LIMIT)
+    offset = _int_param(query, "offset", 0)
+    requested = query.get("type", [",".join(SEARCH_TYPES)])[0].split(",")
+    types = [name for name in SEARCH_TYPES if name in requested]
+    if "invite" in types and not role_can_manage_members(role):
+        types.remove("invite")
+    # Each index returns its best offset + limit + 1 hits; merging by score gives the page and has_more.
+    count = offset + limit + 1
+    searches = {"member": _search_members, "session": _search_sessions, "invite": _search_invites}
+    ranked = heapq.merge(*(searches[name](team_id, match, count) for name in types), key=lambda hit: hit["score"])
+    hits = list(ranked)[offset : offset + limit + 1]
+    results = hits[:limit]
+    for hit in results:
+        del hit["score"]
+    return json_response({"results": results, "limit": limit, "offset": offset, "has_more": len(hits) > limit})
@@ -1,18 +1,22 @@
 from __future__ import annotations
 
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
 from http import HTTPStatus
 from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from ..auth import require_auth
 from ..db import current_timestamp, db, row_to_dict
 from ..http import Request, Response, error_response, json_response
 from ..rbac import role_allows_session_management
 from ..services.activity import log_action
+from ..services.attendance import record_session, season_for, session_moved, session_removed, session_responses
 from ..services.notifications import send_email
-from ..utils.time import parse_iso8601, utc_now
+from ..utils.time import format_iso8601, parse_iso8601, utc_now
 
 SESSION_MUTABLE_FIELDS = {"title", "description", "location", "start_at", "end_at", "is_locked", "auto_lock_minutes"}
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+MAX_SERIES_SESSIONS = 200
 
 
 def session_is_locked(session: dict[str, Any]) -> bool:
@@ -34,7 +38,13 @@ def list_sessions(request: Request, team_id: int) -> Response:
         return auth
     if team_id not in auth.memberships:
         return error_response("Team access denied", HTTPStatus.FORBIDDEN)
-    rows = db.query("SELECT * FROM sessions WHERE team_id = ? ORDER BY start_at", (team_id,))
+    if request.query().get("include_archived", ["0"])[0] in {"1", "true"} and db.has_archive():
+        rows = db.query(
+            "SELECT * FROM sessions WHERE team_id = ? UNION ALL SELECT * FROM archive.sessions WHERE team_id = ? ORDER BY start_at",
+            (team_id, team_id),
+        )
+    else:
+        rows = db.query("SELECT * FROM sessions WHERE team_id = ? ORDER BY start_at", (team_id,))
     sessions = []
     for row in rows:
         session = row_to_dict(row)
@@ -49,7 +59,9 @@ def get_session(request: Request, team_id: int, session_id: int) -> Response:
         return auth
     if team_id not in auth.memberships:
         return error_response("Team access denied", HTTPStatus.FORBIDDEN)
-    row = db.query("SELECT * FROM sessions WHERE id = ? AND team_id = ?", (session_id, team_id))
+    row = db.cached_query("SELECT * FROM sessions WHERE id = ? AND team_id = ?", (session_id, team_id))
+    if not row and db.has_archive():
+        row = db.query("SELECT * FROM archive.sessions WHERE id = ? AND team_id = ?", (session_id, team_id))
     if not row:
         return error_response("Session not found", HTTPStatus.NOT_FOUND)
     session = row_to_dict(row[0])
@@ -79,28 +91,30 @@ def create_session(request: Request, team_id: int) -> Response:
         return error_response("Invalid datetime format")
     session_values = {field: payload.get(field) for field in SESSION_MUTABLE_FIELDS}
     now = current_timestamp()
-    cursor = db.execute(
-        "INSERT INTO sessions(team_id, title, description, location, start_at, end_at, is_locked, auto_lock_minutes, created_by, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (
-            team_id,
-            session_values.get("title"),
-            session_values.get("description"),
-            session_values.get("location"),
-            session_values.get("start_at"),
-            session_values.get("end_at"),
-            1 if session_values.get("is_locked") else 0,
-            session_values.get("auto_lock_minutes"),
-            auth.profile_id,
-            now,
-            now,
-        ),
-    )
+    with db.transaction():
+        cursor = db.execute(
+            "INSERT INTO sessions(team_id, title, description, location, start_at, end_at, is_locked, auto_lock_minutes, created_by, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                team_id,
+                session_values.get("title"),
+                session_values.get("description"),
+                session_values.get("location"),
+                session_values.get("start_at"),
+                session_values.get("end_at"),
+                1 if session_values.get("is_locked") else 0,
+                session_values.get("auto_lock_minutes"),
+                auth.profile_id,
+                now,
+                now,
+            ),
+        )
+        record_session(team_id, session_values["start_at"], 1)
     session_id = cursor.lastrowid
     log_action(team_id, auth.profile_id, "created", "session", session_id, {"title": session_values.get("title")})
     send_email(
         subject="New session scheduled",
         body=f"A session titled {session_values.get('title')} was scheduled.",
-        recipients=[member_row["email"] for member_row in db.query(
+        recipients=[member_row["email"] for member_row in db.cached_query(
             "SELECT profiles.email FROM team_members JOIN profiles ON profiles.id = team_members.profile_id WHERE team_members.team_id = ?",
             (team_id,),
         ) if member_row["email"]],
@@ -108,6 +122,112 @@ def create_session(request: Request, team_id: int) -> Response:
     return json_response({"session_id": session_id}, status=HTTPStatus.CREATED)
 
 
+def expand_series(payload: dict[str, Any]) -> list[tuple[str, str]]:
+    """Expand a weekly rule into (start_at, end_at) pairs in UTC; raises ValueError for a bad rule."""
+    weekdays = payload.get("weekdays")
+    if not isinstance(weekdays, list) or not weekdays:
+        raise ValueError("weekdays must be a non-empty list such as [\"tue\", \"thu\"]")
+    try:
+        days = {WEEKDAYS.index(str(day).strip().lower()[:3]) for day in weekdays}
+        first = date.fromisoformat(payload["start_date"])
+        last = date.fromisoformat(payload["end_date"])
+        starts = time.fromisoformat(payload["start_time"])
+        ends = time.fromisoformat(payload["end_time"])
+        skipped = {date.fromisoformat(value) for value in payload.get("skip_dates") or []}
+    except KeyError as exc:
+        raise ValueError(f"Missing field: {exc.args[0]}") from exc
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid weekday, date or time in series") from exc
+    if last < first:
+        raise ValueError("end_date is before start_date")
+    if ends <= starts:
+        raise ValueError("end_time must be after start_time")
+    try:
+        # Wall-clock times stay put across daylight saving changes in the team's timezone.
+        zone = ZoneInfo(payload.get("timezone") or "UTC")
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise ValueError("Unknown timezone") from exc
+    occurrences = []
+    day = first
+    while day <= last:
+        if day.weekday() in days and day not in skipped:
+            occurrences.append((
+                format_iso8601(datetime.combine(day, starts, zone)),
+                format_iso8601(datetime.combine(day, ends, zone)),
+            ))
+            if len(occurrences) > MAX_SERIES_SESSIONS:
+                raise ValueError(f"A series may create at most {MAX_SERIES_SESSIONS} sessions")
+        day += timedelta(days=1)
+    if not occurrences:
+        raise ValueError("The rule does not produce any sessions")
+    return occurrences
+
+
+def create_series(request: Request, team_id: int) -> Response:
+    auth = require_auth(request)
+    if isinstance(auth, Response):
+        return auth
+    role = auth.memberships.get(team_id)
+    if not role or not role_allows_session_management(role):
+        return error_response("Only managers can create sessions", HTTPStatus.FORBIDDEN)
+    try:
+        payload = request.json()
+    except ValueError as exc:
+        return error_response(str(exc))
+    if not payload.get("title"):
+        return error_response("Missing fields: title")
+    try:
+        occurrences = expand_series(payload)
+    except ValueError as exc:
+        return error_response(str(exc))
+    now = current_timestamp()
+    rows = [
+        (
+            team_id,
+            payload.get("title"),
+            payload.get("description"),
+            payload.get("location"),
+            start_at,
+            end_at,
+            1 if payload.get("is_locked") else 0,
+            payload.get("auto_lock_minutes"),
+            auth.profile_id,
+            now,
+            now,
+        )
+        for start_at, end_at in occurrences
+    ]
+    by_season: dict[int, list[str]] = {}
+    for start_at, _ in occurrences:
+        by_season.setdefault(season_for(start_at), []).append(start_at)
+    with db.transaction():
+        db.executemany(
+            "INSERT INTO sessions(team_id, title, description, location, start_at, end_at, is_locked, auto_lock_minutes, created_by, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        # Nothing else writes inside the transaction, so the new ids are the last len(rows) AUTOINCREMENT values.
+        last_id = db.query("SELECT last_insert_rowid()")[0][0]
+        for starts in by_season.values():
+            record_session(team_id, starts[0], len(starts))
+    session_ids = list(range(last_id - len(rows) + 1, last_id + 1))
+    first_start, last_start = occurrences[0][0], occurrences[-1][0]
+    log_action(team_id, auth.profile_id, "created", "session_series", session_ids[0], {
+        "title": payload.get("title"),
+        "count": len(session_ids),
+        "first_start_at": first_start,
+        "last_start_at": last_start,
+    })
+    send_email(
+        subject="New sessions scheduled",
+        body=f"{len(session_ids)} sessions titled {payload.get('title')} were scheduled from {first_start} to {last_start}.",
+        recipients=[member_row["email"] for member_row in db.cached_query(
+            "SELECT profiles.email FROM team_members JOIN profiles ON profiles.id = team_members.profile_id WHERE team_members.team_id = ?",
+            (team_id,),
+        ) if member_row["email"]],
+    )
+    return json_response({"session_ids": session_ids}, status=HTTPStatus.CREATED)
+
+
 def update_session(request: Request, team_id: int, session_id: int) -> Response:
     auth = require_auth(request)
     if isinstance(auth, Response):
@@ -142,10 +262,15 @@ def update_session(request: Request, team_id: int, session_id: int) -> Response:
     if not updates:
         return json_response({"status": "no_changes"})
     values.extend([current_timestamp(), session_id, team_id])
-    db.execute(
-        f"UPDATE sessions SET {', '.join(updates)}, updated_at = ? WHERE id = ? AND team_id = ?",
-        values,
-    )
+    with db.transaction():
+        # The start time the statistics hold may have moved since the read above.
+        current = db.query("SELECT start_at FROM sessions WHERE id = ? AND team_id = ?", (session_id, team_id))
+        db.execute(
+            f"UPDATE sessions SET {', '.join(updates)}, updated_at = ? WHERE id = ? AND team_id = ?",
+            values,
+        )
+        if current and "start_at" in payload and payload["start_at"] != current[0]["start_at"]:
+            session_moved(team_id, current[0]["start_at"], payload["start_at"], session_responses(team_id, session_id))
     log_action(team_id, auth.profile_id, "updated", "session", session_id, payload)
     return json_response({"status": "updated"})
 
@@ -163,6 +288,10 @@ def delete_session(request: Request, team_id: int, session_id: int) -> Response:
     session = row_to_dict(row[0])
     if session_is_locked(session):
         return error_response("Session is locked", HTTPStatus.FORBIDDEN)
-    db.execute("DELETE FROM sessions WHERE id = ? AND team_id = ?", (session_id, team_id))
+    with db.transaction():
+        # Read the responses with the delete so concurrent duplicate deletes count the session only once.
+        responses = session_responses(team_id, session_id)
+        if db.execute("DELETE FROM sessions WHERE id = ? AND team_id = ?", (session_id, team_id)).rowcount:
+            session_removed(team_id, session["start_at"], responses)
     log_action(team_id, auth.profile_id, "deleted", "session", session_id, {"title": session.get("title")})
     return json_response({"status": "deleted"})
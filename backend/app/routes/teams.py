@@ -2,10 +2,11 @@ from __future__ import annotations
 
 from http import HTTPStatus
 
-from ..auth import require_auth
+from ..auth import bump_auth_version, require_auth
 from ..db import db, row_to_dict
 from ..http import Request, Response, error_response, json_response
 from ..rbac import role_can_manage_members
+from .calendar import forget_feed_tokens
 
 
 def get_teams(request: Request) -> Response:
@@ -26,7 +27,7 @@ def get_members(request: Request, team_id: int) -> Response:
         role = auth.memberships[team_id]
     except KeyError:
         return error_response("Not a member of this team", HTTPStatus.FORBIDDEN)
-    rows = db.query(
+    rows = db.cached_query(
         "SELECT team_members.id, team_members.role, team_members.joined_at, profiles.display_name, profiles.email FROM team_members JOIN profiles ON profiles.id = team_members.profile_id WHERE team_members.team_id = ?",
         (team_id,),
     )
@@ -48,7 +49,10 @@ def update_member(request: Request, team_id: int, member_id: int) -> Response:
     new_role = payload.get("role")
     if new_role not in {"manager", "coach", "player"}:
         return error_response("Invalid role")
+    member = db.query("SELECT profile_id FROM team_members WHERE id = ? AND team_id = ?", (member_id, team_id))
     db.execute("UPDATE team_members SET role = ? WHERE id = ? AND team_id = ?", (new_role, member_id, team_id))
+    if member:
+        bump_auth_version(member[0]["profile_id"])
     return json_response({"status": "updated"})
 
 
@@ -59,5 +63,9 @@ def delete_member(request: Request, team_id: int, member_id: int) -> Response:
     role = auth.memberships.get(team_id)
     if not role or not role_can_manage_members(role):
         return error_response("Managers only", HTTPStatus.FORBIDDEN)
+    member = db.query("SELECT profile_id FROM team_members WHERE id = ? AND team_id = ?", (member_id, team_id))
     db.execute("DELETE FROM team_members WHERE id = ? AND team_id = ?", (member_id, team_id))
+    if member:
+        bump_auth_version(member[0]["profile_id"])
+    forget_feed_tokens(team_id)
     return json_response({"status": "removed"})
@@ -1,17 +1,48 @@
 from __future__ import annotations
 
+import importlib
 import logging
 from http import HTTPStatus
-from wsgiref.simple_server import make_server
+from typing import Any
+from wsgiref.util import FileWrapper
 
+from . import admission, profiling
 from .auth import handle_magic_login
 from .config import settings
 from .db import db
 from .http import Request, Response, error_response, router
-from .routes import invites, rsvps, sessions, teams
+from .idempotency import with_idempotency
 
 logger = logging.getLogger("otj_u8s")
 
+FILE_BLOCK_SIZE = 64 * 1024
+
+
+class _LazyModule:
+    """Stands in for a route module until a request first reaches one of its handlers."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attribute: str) -> Any:
+        value = getattr(importlib.import_module(self._name, __package__), attribute)
+        # Later lookups hit the instance dict and skip __getattr__ entirely.
+        self.__dict__[attribute] = value
+        return value
+
+
+# A worker imports only the route modules its traffic actually reaches.
+admin = _LazyModule(".routes.admin")
+attendance = _LazyModule(".routes.attendance")
+batch = _LazyModule(".routes.batch")
+calendar = _LazyModule(".routes.calendar")
+frontend = _LazyModule(".routes.frontend")
+invites = _LazyModule(".routes.invites")
+rsvps = _LazyModule(".routes.rsvps")
+search = _LazyModule(".routes.search")
+sessions = _LazyModule(".routes.sessions")
+teams = _LazyModule(".routes.teams")
+
 _routes_registered = False
 
 
@@ -21,7 +52,7 @@ def register_routes() -> None:
         return
     router.add("POST", "/auth/magic-link", lambda request: handle_magic_login(request))
 
-    router.add("GET", "/teams", teams.get_teams)
+    router.add("GET", "/teams", lambda request: teams.get_teams(request))
     router.add("GET", "/teams/:team_id/members", lambda request, team_id: teams.get_members(request, int(team_id)))
     router.add("PATCH", "/teams/:team_id/members/:member_id", lambda request, team_id, member_id: teams.update_member(request, int(team_id), int(member_id)))
     router.add("DELETE", "/teams/:team_id/members/:member_id", lambda request, team_id, member_id: teams.delete_member(request, int(team_id), int(member_id)))
@@ -32,6 +63,7 @@ def register_routes() -> None:
 
     router.add("GET", "/teams/:team_id/sessions", lambda request, team_id: sessions.list_sessions(request, int(team_id)))
     router.add("POST", "/teams/:team_id/sessions", lambda request, team_id: sessions.create_session(request, int(team_id)))
+    router.add("POST", "/teams/:team_id/sessions/series", lambda request, team_id: sessions.create_series(request, int(team_id)))
     router.add("GET", "/teams/:team_id/sessions/:session_id", lambda request, team_id, session_id: sessions.get_session(request, int(team_id), int(session_id)))
     router.add("PUT", "/teams/:team_id/sessions/:session_id", lambda request, team_id, session_id: sessions.update_session(request, int(team_id), int(session_id)))
     router.add("DELETE", "/teams/:team_id/sessions/:session_id", lambda request, team_id, session_id: sessions.delete_session(request, int(team_id), int(session_id)))
@@ -40,87 +72,165 @@ def register_routes() -> None:
     router.add("PUT", "/teams/:team_id/sessions/:session_id/rsvps/self", lambda request, team_id, session_id: rsvps.upsert_rsvp(request, int(team_id), int(session_id)))
     router.add("PUT", "/teams/:team_id/sessions/:session_id/rsvps/:profile_id", lambda request, team_id, session_id, profile_id: rsvps.upsert_rsvp(request, int(team_id), int(session_id), int(profile_id)))
     router.add("DELETE", "/teams/:team_id/sessions/:session_id/rsvps/:profile_id", lambda request, team_id, session_id, profile_id: rsvps.delete_rsvp(request, int(team_id), int(session_id), int(profile_id)))
-    _routes_registered = True
 
-
-def _select_cors_origin(request: Request) -> str | None:
-    origin = request.headers.get("Origin")
-    if not origin:
-        return None
-    allowed_origins = settings.cors_allowed_origins
-    if "*" in allowed_origins:
-        if settings.cors_allow_credentials:
-            return origin
-        return "*"
-    if origin in allowed_origins:
-        return origin
-    return None
-
-
-def _build_cors_headers(request: Request, include_preflight: bool = False) -> dict[str, str]:
-    origin = _select_cors_origin(request)
-    if origin is None:
-        return {}
-    headers: dict[str, str] = {"Access-Control-Allow-Origin": origin}
-    if origin != "*":
-        headers["Vary"] = "Origin"
-    if settings.cors_allow_credentials:
-        headers["Access-Control-Allow-Credentials"] = "true"
-    allow_methods = ", ".join(settings.cors_allowed_methods)
-    allow_headers = ", ".join(settings.cors_allowed_headers)
-    if include_preflight:
-        headers["Access-Control-Allow-Methods"] = allow_methods
-        headers["Access-Control-Allow-Headers"] = allow_headers
-    return headers
+    router.add("POST", "/teams/:team_id/calendar-feed", lambda request, team_id: calendar.create_feed(request, int(team_id)))
+    router.add("DELETE", "/teams/:team_id/calendar-feed", lambda request, team_id: calendar.revoke_feeds(request, int(team_id)))
+    router.add("GET", "/teams/:team_id/attendance", lambda request, team_id: attendance.get_attendance(request, int(team_id)))
+    router.add("GET", "/teams/:team_id/search", lambda request, team_id: search.search_team(request, int(team_id)))
+
+    router.add("GET", "/teams/:team_id/calendar.ics", lambda request, team_id: calendar.get_calendar(request, int(team_id)))
+
+    router.add("POST", "/batch", lambda request: batch.handle_batch(request))
+
+    router.add("POST", "/internal/backup", lambda request: admin.start_backup(request))
+    router.add("GET", "/internal/backup", lambda request: admin.backup_status(request))
+    router.add("GET", "/internal/query-cache", lambda request: admin.query_cache_status(request))
+    router.add("POST", "/internal/profile", lambda request: admin.start_profiling(request))
+    router.add("GET", "/internal/profile", lambda request: admin.profiling_status(request))
+    router.add("GET", "/internal/profile/stats", lambda request: admin.download_profile(request))
+    router.add("GET", "/internal/allocations", lambda request: admin.allocation_status(request))
+
+    if settings.serve_frontend:
+        router.add("GET", "/", lambda request: frontend.get_index(request))
+        router.add("GET", "/index.html", lambda request: frontend.get_index(request))
+        router.add("GET", "/static/:asset", lambda request, asset: frontend.get_asset(request, asset))
+    routes = []
+    for method, pattern, handler in router.routes:
+        if ":team_id" in pattern:
+            handler = _team_scoped(handler)
+        routes.append((method, pattern, handler))
+    router.routes = routes
+    _routes_registered = True
 
 
-def _merge_headers(base_headers: list[tuple[str, str]], extra: dict[str, str]) -> list[tuple[str, str]]:
-    headers: dict[str, str] = {}
-    for key, value in base_headers:
-        headers[key] = value
-    for key, value in extra.items():
-        if key.lower() == "vary" and key in headers:
-            existing_values = {item.strip() for item in headers[key].split(",") if item.strip()}
-            existing_values.update(item.strip() for item in value.split(",") if item.strip())
-            headers[key] = ", ".join(sorted(existing_values))
+def _team_scoped(handler):
+    def wrapper(request: Request, **params: str) -> Response:
+        try:
+            team_id = int(params["team_id"])
+        except ValueError:
+            return error_response("Not found", HTTPStatus.NOT_FOUND)
+        with db.use_team(team_id):
+            return handler(request, **params)
+
+    return wrapper
+
+
+class CorsHeaders:
+    """CORS response headers, built once from settings instead of on every response."""
+
+    __slots__ = ("any_origin", "echo_any_origin", "listed", "shared")
+
+    def __init__(self, origins: tuple[str, ...], methods: tuple[str, ...], headers: tuple[str, ...], allow_credentials: bool, exposed: tuple[str, ...] = ()):
+        shared: list[tuple[str, str]] = []
+        if allow_credentials:
+            shared.append(("Access-Control-Allow-Credentials", "true"))
+        shared.append(("Access-Control-Allow-Methods", ", ".join(methods)))
+        shared.append(("Access-Control-Allow-Headers", ", ".join(headers)))
+        if exposed:
+            shared.append(("Access-Control-Expose-Headers", ", ".join(exposed)))
+        # Echoed origins vary the response, so caches must key on Origin.
+        self.shared = (("Vary", "Origin"), *shared)
+        wildcard = "*" in origins
+        # Browsers reject "*" on credentialed requests, so credentials echo the caller's origin instead.
+        self.any_origin = (("Access-Control-Allow-Origin", "*"), *shared) if wildcard and not allow_credentials else None
+        self.echo_any_origin = wildcard and allow_credentials
+        self.listed = {origin: (("Access-Control-Allow-Origin", origin), *self.shared) for origin in origins if origin != "*"}
+
+    def for_origin(self, origin: str | None) -> tuple[tuple[str, str], ...]:
+        if not origin:
+            return ()
+        if self.any_origin is not None:
+            return self.any_origin
+        listed = self.listed.get(origin)
+        if listed is not None:
+            return listed
+        if self.echo_any_origin:
+            return (("Access-Control-Allow-Origin", origin), *self.shared)
+        return ()
+
+
+cors_headers = CorsHeaders(
+    settings.cors_allowed_origins,
+    settings.cors_allowed_methods,
+    settings.cors_allowed_headers,
+    settings.cors_allow_credentials,
+    settings.cors_exposed_headers,
+)
+
+
+def _add_cors_headers(headers: list[tuple[str, str]], cors: tuple[tuple[str, str], ...]) -> list[tuple[str, str]]:
+    """Append cors to headers, folding its Vary into one the handler already set."""
+    existing = next((index for index, (key, _) in enumerate(headers) if key == "Vary"), None)
+    if existing is None:
+        headers.extend(cors)
+        return headers
+    for key, value in cors:
+        if key == "Vary":
+            values = {item.strip() for item in f"{headers[existing][1]},{value}".split(",") if item.strip()}
+            headers[existing] = (key, ", ".join(sorted(values)))
         else:
-            headers[key] = value
-    return [(key, value) for key, value in headers.items()]
+            headers.append((key, value))
+    return headers
 
 
 def _handle_preflight(request: Request) -> Response:
-    headers = _build_cors_headers(request, include_preflight=True)
-    if not headers:
+    if not cors_headers.for_origin(request.headers.get("Origin")):
         return error_response("CORS origin not allowed", HTTPStatus.FORBIDDEN)
-    return Response(status=HTTPStatus.NO_CONTENT, body=None, headers=headers)
+    # finalize_response adds the CORS headers to every successful response, this one included.
+    return Response(status=HTTPStatus.NO_CONTENT, body=None)
 
 
-def application(environ, start_response):
+def dispatch(request: Request) -> Response:
     register_routes()
-    request = Request(environ)
     if request.method == "OPTIONS":
-        response = _handle_preflight(request)
-    else:
-        match = router.match(request.method, request.path)
-        if match is None:
-            response = error_response("Not found", HTTPStatus.NOT_FOUND)
-        else:
-            handler, params = match
-            try:
-                response = handler(request, **params)
-            except Exception as exc:  # pylint: disable=broad-except
-                logger.exception("Unhandled error: %s", exc)
-                response = error_response("Server error", HTTPStatus.INTERNAL_SERVER_ERROR)
+        return _handle_preflight(request)
+    resolved = router.resolve(request.method, request.path)
+    route = (request.method, resolved[0]) if resolved is not None else None
+    limited = admission.check_rate_limits(request, route)
+    if limited is not None:
+        return limited
+    if resolved is None:
+        return error_response("Not found", HTTPStatus.NOT_FOUND)
+    _, handler, params = resolved
+    with admission.gate.admit() as admitted:
+        if not admitted:
+            return admission.overloaded()
+        try:
+            return profiling.observe(
+                request,
+                route,
+                params,
+                lambda: with_idempotency(request, lambda: handler(request, **params)),
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Unhandled error: %s", exc)
+            return error_response("Server error", HTTPStatus.INTERNAL_SERVER_ERROR)
+
+
+def finalize_response(request: Request, response: Response) -> tuple[int, list[tuple[str, str]], bytes]:
     status_code, headers, body = response.to_wsgi()
     if status_code < 400:
-        cors_headers = _build_cors_headers(request, include_preflight=True)
-        if cors_headers:
-            headers = _merge_headers(headers, cors_headers)
+        cors = cors_headers.for_origin(request.headers.get("Origin"))
+        if cors:
+            headers = _add_cors_headers(headers, cors)
+    return status_code, headers, body
+
+
+def application(environ, start_response):
+    request = Request(environ)
+    response = dispatch(request)
+    status_code, headers, body = finalize_response(request, response)
     start_response(f"{status_code} {HTTPStatus(status_code).phrase}", headers)
+    if response.file is not None:
+        file_wrapper = environ.get("wsgi.file_wrapper", FileWrapper)
+        return file_wrapper(response.file, FILE_BLOCK_SIZE)
     return [body]
 
 
 def run(port: int = 8000) -> None:
+    # Only the stdlib development server needs http.server; WSGI/ASGI hosts never load it.
+    from wsgiref.simple_server import make_server
+
     logging.basicConfig(level=logging.INFO)
     db.migrate()
     register_routes()
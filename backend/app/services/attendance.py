@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Iterable
+
+from ..config import settings
+from ..db import current_timestamp, db
+from ..utils.time import ensure_timezone, parse_iso8601, utc_now
+
+STATUSES = ("yes", "no", "maybe", "pending")
+
+
+def season_of(value: datetime) -> int:
+    value = ensure_timezone(value).astimezone(timezone.utc)
+    return value.year if value.month >= settings.season_start_month else value.year - 1
+
+
+def season_for(start_at: str) -> int:
+    return season_of(parse_iso8601(start_at))
+
+
+def current_season() -> int:
+    return season_of(utc_now())
+
+
+def _streak(answers: Iterable[tuple[datetime, str]]) -> int:
+    # Consecutive "yes" answers counting back from the latest session answered.
+    streak = 0
+    for _, status in sorted(answers, key=lambda answer: answer[0], reverse=True):
+        if status != "yes":
+            break
+        streak += 1
+    return streak
+
+
+def current_streak(team_id: int, profile_id: int, season: int) -> int:
+    rows = db.query(
+        "SELECT sessions.start_at, rsvps.status FROM rsvps JOIN sessions ON sessions.id = rsvps.session_id WHERE rsvps.profile_id = ? AND sessions.team_id = ?",
+        (profile_id, team_id),
+    )
+    answers = [(ensure_timezone(parse_iso8601(row["start_at"])), row["status"]) for row in rows]
+    return _streak(answer for answer in answers if season_of(answer[0]) == season)
+
+
+def record_rsvp(team_id: int, profile_id: int, start_at: str, old_status: str | None, new_status: str | None) -> None:
+    """Apply one RSVP change to the player's season row; call after the rsvps table is written."""
+    season = season_for(start_at)
+    yes, no, maybe, pending = ((status == new_status) - (status == old_status) for status in STATUSES)
+    db.execute(
+        "INSERT INTO attendance_stats(team_id, season, profile_id, yes_count, no_count, maybe_count, pending_count, current_streak, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(team_id, season, profile_id) DO UPDATE SET yes_count = yes_count + excluded.yes_count, no_count = no_count + excluded.no_count, maybe_count = maybe_count + excluded.maybe_count, pending_count = pending_count + excluded.pending_count, current_streak = excluded.current_streak, updated_at = excluded.updated_at",
+        (team_id, season, profile_id, yes, no, maybe, pending, current_streak(team_id, profile_id, season), current_timestamp()),
+    )
+
+
+def record_session(team_id: int, start_at: str, delta: int) -> None:
+    db.execute(
+        "INSERT INTO attendance_seasons(team_id, season, session_count) VALUES (?, ?, ?) ON CONFLICT(team_id, season) DO UPDATE SET session_count = session_count + excluded.session_count",
+        (team_id, season_for(start_at), delta),
+    )
+
+
+def session_responses(team_id: int, session_id: int) -> list[sqlite3.Row]:
+    return db.query(
+        "SELECT rsvps.profile_id, rsvps.status FROM rsvps JOIN sessions ON sessions.id = rsvps.session_id WHERE rsvps.session_id = ? AND sessions.team_id = ?",
+        (session_id, team_id),
+    )
+
+
+def session_removed(team_id: int, start_at: str, responses: list[sqlite3.Row]) -> None:
+    record_session(team_id, start_at, -1)
+    for response in responses:
+        record_rsvp(team_id, response["profile_id"], start_at, response["status"], None)
+
+
+def session_moved(team_id: int, old_start_at: str, new_start_at: str, responses: list[sqlite3.Row]) -> None:
+    # A new start time can change the season and the order streaks are counted in.
+    record_session(team_id, old_start_at, -1)
+    record_session(team_id, new_start_at, 1)
+    for response in responses:
+        record_rsvp(team_id, response["profile_id"], old_start_at, response["status"], None)
+        record_rsvp(team_id, response["profile_id"], new_start_at, None, response["status"])
+
+
+def rebuild_team(team_id: int, updated_at: str | None = None) -> int:
+    """Recompute every attendance row for one team from sessions and rsvps, stamped updated_at (default: now)."""
+    with db.use_team(team_id):
+        # Archived seasons keep their statistics, so their rows are counted too.
+        archived = db.has_archive(for_write=True)
+    with db.use_team(team_id), db.transaction():
+        sessions = db.query("SELECT id, start_at FROM sessions WHERE team_id = ?", (team_id,))
+        rows = db.query(
+            "SELECT rsvps.profile_id, rsvps.status, sessions.start_at FROM rsvps JOIN sessions ON sessions.id = rsvps.session_id WHERE sessions.team_id = ?",
+            (team_id,),
+        )
+        if archived:
+            sessions += db.query("SELECT id, start_at FROM archive.sessions WHERE team_id = ?", (team_id,))
+            rows += db.query(
+                "SELECT rsvps.profile_id, rsvps.status, sessions.start_at FROM archive.rsvps AS rsvps JOIN archive.sessions AS sessions ON sessions.id = rsvps.session_id WHERE sessions.team_id = ?",
+                (team_id,),
+            )
+        session_counts: dict[int, int] = defaultdict(int)
+        for session in sessions:
+            session_counts[season_for(session["start_at"])] += 1
+        answers: dict[tuple[int, int], list[tuple[datetime, str]]] = defaultdict(list)
+        for row in rows:
+            start = ensure_timezone(parse_iso8601(row["start_at"]))
+            answers[(season_of(start), row["profile_id"])].append((start, row["status"]))
+        now = updated_at or current_timestamp()
+        stats_rows = [
+            (team_id, season, profile_id, *(sum(status == counted for _, status in player) for counted in STATUSES), _streak(player), now)
+            for (season, profile_id), player in answers.items()
+        ]
+        db.execute("DELETE FROM attendance_stats WHERE team_id = ?", (team_id,))
+        db.execute("DELETE FROM attendance_seasons WHERE team_id = ?", (team_id,))
+        db.executemany(
+            "INSERT INTO attendance_stats(team_id, season, profile_id, yes_count, no_count, maybe_count, pending_count, current_streak, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            stats_rows,
+        )
+        db.executemany(
+            "INSERT INTO attendance_seasons(team_id, season, session_count) VALUES (?, ?, ?)",
+            [(team_id, season, count) for season, count in session_counts.items()],
+        )
+    return len(stats_rows)
+
+
+def rebuild(team_ids: list[int] | None = None, updated_at: str | None = None) -> dict[str, int]:
+    if team_ids is None:
+        team_ids = [row["id"] for row in db.query("SELECT id FROM teams ORDER BY id")]
+    rows = sum(rebuild_team(team_id, updated_at) for team_id in team_ids)
+    return {"teams": len(team_ids), "rows": rows}
+
+
+def main(argv: list[str] | None = None) -> None:
+    # Request threads import this module for the incremental updates; only the CLI needs argparse.
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the attendance_stats table")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute statistics from sessions and RSVPs")
+    parser.add_argument("--team", type=int, action="append", help="Limit the rebuild to this team (repeatable)")
+    args = parser.parse_args(argv)
+    if not args.rebuild:
+        parser.error("nothing to do; pass --rebuild")
+    db.migrate()
+    print(json.dumps(rebuild(args.team)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Any, Iterable
+
+from ..db import db
+from ..utils.time import ensure_timezone, parse_iso8601, utc_now
+
+PRODUCT_ID = "-//OTJ U8s//Training Calendar//EN"
+
+
+@dataclass(frozen=True)
+class RenderedCalendar:
+    stamp: tuple[int, ...]
+    body: str
+    etag: str
+    last_modified: str
+
+
+# The last feed rendered per team, reused while the team's change stamp is unchanged.
+_lock = threading.Lock()
+_rendered: dict[int, RenderedCalendar] = {}
+
+
+def team_stamp(team_id: int) -> tuple[int, ...]:
+    """Change stamp for a team's feed: the query cache's write generations for the tables it renders.
+
+    Costs a dictionary lookup rather than a scan; commits by other workers and CLIs move it too.
+    """
+    return db.table_stamp("sessions", "teams")
+
+
+def cached_calendar(team_id: int, stamp: tuple[int, ...]) -> RenderedCalendar | None:
+    with _lock:
+        rendered = _rendered.get(team_id)
+    if rendered is None or rendered.stamp != stamp:
+        return None
+    return rendered
+
+
+def store_calendar(team_id: int, stamp: tuple[int, ...], body: str) -> RenderedCalendar:
+    etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+    # Rendered only after the stamp moved, so this is never earlier than the change it reflects.
+    changed_at = utc_now().replace(microsecond=0)
+    rendered = RenderedCalendar(stamp=stamp, body=body, etag=etag, last_modified=format_datetime(changed_at, usegmt=True))
+    with _lock:
+        _rendered[team_id] = rendered
+    return rendered
+
+
+def _escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    current = ""
+    limit = 75
+    for char in line:
+        if len((current + char).encode("utf-8")) > limit:
+            parts.append(current)
+            current = char
+            limit = 74
+        else:
+            current += char
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def _format_ics_datetime(value: str) -> str:
+    return ensure_timezone(parse_iso8601(value)).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_calendar(team_name: str, sessions: Iterable[dict[str, Any]]) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODUCT_ID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape_text(f'OTJ U8s {team_name}')}",
+    ]
+    for session in sessions:
+        lines.extend([
+            "BEGIN:VEVENT",
+            f"UID:session-{session['id']}@otj-u8s",
+            f"DTSTAMP:{_format_ics_datetime(session['updated_at'])}",
+            f"DTSTART:{_format_ics_datetime(session['start_at'])}",
+            f"DTEND:{_format_ics_datetime(session['end_at'])}",
+            f"SUMMARY:{_escape_text(session['title'])}",
+        ])
+        if session.get("location"):
+            lines.append(f"LOCATION:{_escape_text(session['location'])}")
+        if session.get("description"):
+            lines.append(f"DESCRIPTION:{_escape_text(session['description'])}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
@@ -1,14 +1,24 @@
 from __future__ import annotations
 
 import logging
-import smtplib
-from email.message import EmailMessage
-from typing import Iterable
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Iterable
 
 from ..config import settings
 
+if TYPE_CHECKING:
+    from email.message import EmailMessage
+
 logger = logging.getLogger("notifications")
 
+_executor: Executor | None = None
+
+
+def deliver_with(executor: Executor | None) -> None:
+    """Hand SMTP delivery to executor instead of the calling thread (the ASGI server sets this)."""
+    global _executor
+    _executor = executor
+
 
 def send_email(subject: str, body: str, recipients: Iterable[str]) -> None:
     recipients = list(recipients)
@@ -17,11 +27,30 @@ def send_email(subject: str, body: str, recipients: Iterable[str]) -> None:
     if not settings.enable_email or not settings.smtp_host or not settings.email_sender:
         logger.info("Email skipped for %s because provider not configured", subject)
         return
+    # The email package and smtplib load on the first real send, so unconfigured workers never pay for them.
+    from email.message import EmailMessage
+
     message = EmailMessage()
     message["Subject"] = subject
     message["From"] = settings.email_sender
     message["To"] = ", ".join(recipients)
     message.set_content(body)
+    if _executor is not None:
+        _executor.submit(_deliver_logged, message, recipients)
+        return
+    _deliver(message, recipients)
+
+
+def _deliver_logged(message: EmailMessage, recipients: list[str]) -> None:
+    try:
+        _deliver(message, recipients)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Email to %s failed", recipients)
+
+
+def _deliver(message: EmailMessage, recipients: list[str]) -> None:
+    import smtplib
+
     with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as client:
         if settings.smtp_username and settings.smtp_password:
             client.starttls()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in a fresh interpreter under -X importtime: stderr carries the import log, stdout the timings.
+CHILD = """
+import io, json, sys, time
+started = time.perf_counter()
+from app.server import application
+imported = time.perf_counter()
+from app.db import db
+db.migrate()
+migrated = time.perf_counter()
+sys.stderr.write("startup-bench: ready\\n")
+loaded = set(sys.modules)
+
+def request():
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": PATH, "QUERY_STRING": "", "CONTENT_LENGTH": "0",
+               "wsgi.input": io.BytesIO(), "REMOTE_ADDR": "127.0.0.1", "HTTP_AUTHORIZATION": "Bearer startup-bench"}
+    began = time.perf_counter()
+    b"".join(application(environ, lambda status, headers: None))
+    return (time.perf_counter() - began) * 1000
+
+first = request()
+sys.stderr.write("startup-bench: first request done\\n")
+second = request()
+# importlib.import_module (the lazy route modules) bypasses the importtime log, so diff sys.modules as well.
+print(json.dumps({
+    "startup_modules": sorted(loaded),
+    "first_request_modules": sorted(set(sys.modules) - loaded),
+    "import_ms": (imported - started) * 1000,
+    "migrate_ms": (migrated - imported) * 1000,
+    "first_request_ms": first,
+    "second_request_ms": second,
+}))
+"""
+
+
+PHASES = ("startup", "first request", "later")
+TIMINGS = ("import_ms", "migrate_ms", "first_request_ms", "second_request_ms")
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int, str]]:
+    """Map module name to (self us, cumulative us, phase) from -X importtime output and the child's markers."""
+    modules: dict[str, tuple[int, int, str]] = {}
+    phase = 0
+    for line in stderr.splitlines():
+        if line.startswith("startup-bench:"):
+            phase += 1
+        elif line.startswith("import time:") and "self [us]" not in line:
+            own, cumulative, name = line[len("import time:"):].split("|", 2)
+            modules[name.strip()] = (int(own), int(cumulative), PHASES[min(phase, 2)])
+    return modules
+
+
+def run_once(path: str, env: dict[str, str]) -> tuple[dict[str, float], dict[str, tuple[int, int, str]]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"PATH = {path!r}\n{CHILD}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1]), parse_importtime(completed.stderr)
+
+
+def benchmark(runs: int, path: str, database: str | None) -> dict[str, object]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND_DIR), env.get("PYTHONPATH")]))
+    # Deployed workers load cached bytecode; without it every run would time the compiler too.
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    with tempfile.TemporaryDirectory() as scratch:
+        env["DATABASE_PATH"] = database or os.path.join(scratch, "startup_bench.db")
+        # The first run creates the schema and writes bytecode; workers start warm, so it is not timed.
+        run_once(path, env)
+        samples = [run_once(path, env) for _ in range(runs)]
+    timings = {key: round(statistics.median(sample[0][key] for sample in samples), 2) for key in TIMINGS}
+    result, modules = samples[-1]
+    loaded = {"startup": result["startup_modules"], "first request": result["first_request_modules"]}
+    return {
+        "runs": runs,
+        "path": path,
+        **timings,
+        "modules_imported": {phase: len(names) for phase, names in loaded.items()},
+        "app_modules": {phase: [name for name in names if name.split(".")[0] == "app"] for phase, names in loaded.items()},
+        "slowest_imports": sorted(
+            ({"module": name, "self_us": own, "cumulative_us": cumulative, "phase": seen} for name, (own, cumulative, seen) in modules.items()),
+            key=lambda item: item["self_us"],
+            reverse=True,
+        ),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure worker import time and first-request latency in fresh interpreters")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start; medians are reported")
+    parser.add_argument("--path", default="/teams", help="GET path for the first and second request")
+    parser.add_argument("--database", help="Database to start against (default: a scratch file)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list, by self time")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+    report = benchmark(max(1, args.runs), args.path, args.database)
+    report["slowest_imports"] = report["slowest_imports"][: args.top]
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"median of {report['runs']} fresh interpreters, GET {report['path']}")
+    for key in TIMINGS:
+        print(f"  {key:<18} {report[key]:8.2f}")
+    for phase in PHASES[:2]:
+        print(f"  {phase}: {report['modules_imported'][phase]} modules, app: {', '.join(report['app_modules'][phase]) or '-'}")
+    print("slowest imports by self time (last run):")
+    for item in report["slowest_imports"]:
+        print(f"  {item['self_us'] / 1000:8.2f} ms  {item['cumulative_us'] / 1000:8.2f} ms cumulative  {item['module']} ({item['phase']})")
+
+
+if __name__ == "__main__":
+    main()
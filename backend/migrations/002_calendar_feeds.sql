@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS calendar_feed_tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id INTEGER NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+    profile_id INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    token TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    revoked_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_calendar_feed_tokens_team_profile ON calendar_feed_tokens(team_id, profile_id);
@@ -0,0 +1,9 @@
+-- Membership lookups by profile run on every authenticated request.
+CREATE INDEX IF NOT EXISTS idx_team_members_profile ON team_members(profile_id, team_id, role);
+
+-- Magic-link login matches on both email and code.
+CREATE INDEX IF NOT EXISTS idx_invites_email_code ON invites(email, code);
+
+DROP INDEX IF EXISTS idx_invites_email;
+
+CREATE INDEX IF NOT EXISTS idx_rsvps_profile ON rsvps(profile_id);
@@ -0,0 +1,3 @@
+-- Bumped whenever a profile's memberships change or its tokens are revoked, so
+-- stateless access tokens carrying an older version are re-checked.
+ALTER TABLE profiles ADD COLUMN auth_version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,72 @@
+-- Full-text search for GET /teams/:team_id/search. The FTS tables are
+-- external-content indexes over the base tables, kept in sync by triggers.
+-- team_id is indexed as a token so team filtering happens inside the match.
+CREATE VIRTUAL TABLE IF NOT EXISTS profiles_fts USING fts5(
+    display_name, email, guardian_name,
+    content='profiles', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS profiles_fts_insert AFTER INSERT ON profiles BEGIN
+    INSERT INTO profiles_fts(rowid, display_name, email, guardian_name)
+    VALUES (new.id, new.display_name, new.email, new.guardian_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS profiles_fts_delete AFTER DELETE ON profiles BEGIN
+    INSERT INTO profiles_fts(profiles_fts, rowid, display_name, email, guardian_name)
+    VALUES ('delete', old.id, old.display_name, old.email, old.guardian_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS profiles_fts_update AFTER UPDATE OF display_name, email, guardian_name ON profiles BEGIN
+    INSERT INTO profiles_fts(profiles_fts, rowid, display_name, email, guardian_name)
+    VALUES ('delete', old.id, old.display_name, old.email, old.guardian_name);
+    INSERT INTO profiles_fts(rowid, display_name, email, guardian_name)
+    VALUES (new.id, new.display_name, new.email, new.guardian_name);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS invites_fts USING fts5(
+    team_id, email,
+    content='invites', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS invites_fts_insert AFTER INSERT ON invites BEGIN
+    INSERT INTO invites_fts(rowid, team_id, email) VALUES (new.id, new.team_id, new.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS invites_fts_delete AFTER DELETE ON invites BEGIN
+    INSERT INTO invites_fts(invites_fts, rowid, team_id, email) VALUES ('delete', old.id, old.team_id, old.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS invites_fts_update AFTER UPDATE OF team_id, email ON invites BEGIN
+    INSERT INTO invites_fts(invites_fts, rowid, team_id, email) VALUES ('delete', old.id, old.team_id, old.email);
+    INSERT INTO invites_fts(rowid, team_id, email) VALUES (new.id, new.team_id, new.email);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+    team_id, title, location, description,
+    content='sessions', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions BEGIN
+    INSERT INTO sessions_fts(rowid, team_id, title, location, description)
+    VALUES (new.id, new.team_id, new.title, new.location, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_delete AFTER DELETE ON sessions BEGIN
+    INSERT INTO sessions_fts(sessions_fts, rowid, team_id, title, location, description)
+    VALUES ('delete', old.id, old.team_id, old.title, old.location, old.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_update AFTER UPDATE OF team_id, title, location, description ON sessions BEGIN
+    INSERT INTO sessions_fts(sessions_fts, rowid, team_id, title, location, description)
+    VALUES ('delete', old.id, old.team_id, old.title, old.location, old.description);
+    INSERT INTO sessions_fts(rowid, team_id, title, location, description)
+    VALUES (new.id, new.team_id, new.title, new.location, new.description);
+END;
+
+-- Index rows that existed before this migration.
+INSERT INTO profiles_fts(profiles_fts) VALUES ('rebuild');
+INSERT INTO invites_fts(invites_fts) VALUES ('rebuild');
+INSERT INTO sessions_fts(sessions_fts) VALUES ('rebuild');
@@ -0,0 +1,26 @@
+-- Per-player attendance counts per season, maintained incrementally by the
+-- RSVP and session routes (services/attendance.py). Seasons are identified by
+-- the year they start in. Existing RSVPs are counted by running
+-- python -m app.services.attendance --rebuild once after upgrading.
+CREATE TABLE IF NOT EXISTS attendance_stats (
+    team_id INTEGER NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+    season INTEGER NOT NULL,
+    profile_id INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    yes_count INTEGER NOT NULL DEFAULT 0,
+    no_count INTEGER NOT NULL DEFAULT 0,
+    maybe_count INTEGER NOT NULL DEFAULT 0,
+    pending_count INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (team_id, season, profile_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_attendance_stats_profile ON attendance_stats(profile_id);
+
+-- Sessions scheduled per team and season; no-response counts are derived from it.
+CREATE TABLE IF NOT EXISTS attendance_seasons (
+    team_id INTEGER NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+    season INTEGER NOT NULL,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (team_id, season)
+) WITHOUT ROWID;
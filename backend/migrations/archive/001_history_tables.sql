@@ -0,0 +1,44 @@
+-- Rows from closed seasons, moved here by python -m app.archive. Columns match
+-- the hot tables so history queries can UNION them; ids are kept as-is.
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    team_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    location TEXT,
+    start_at TEXT NOT NULL,
+    end_at TEXT NOT NULL,
+    is_locked INTEGER NOT NULL DEFAULT 0,
+    auto_lock_minutes INTEGER,
+    created_by INTEGER,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_team_start ON sessions(team_id, start_at);
+
+CREATE TABLE IF NOT EXISTS rsvps (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL,
+    profile_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    note TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE(session_id, profile_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rsvps_profile ON rsvps(profile_id);
+
+CREATE TABLE IF NOT EXISTS activity_logs (
+    id INTEGER PRIMARY KEY,
+    team_id INTEGER NOT NULL,
+    profile_id INTEGER,
+    action TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    entity_id INTEGER,
+    payload TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_logs_team ON activity_logs(team_id, created_at DESC);
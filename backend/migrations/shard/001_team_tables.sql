@@ -0,0 +1,61 @@
+-- Team-scoped tables for one shard file. References to teams and profiles
+-- live in the core database, so only intra-shard foreign keys are declared.
+CREATE TABLE IF NOT EXISTS invites (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    role TEXT NOT NULL,
+    code TEXT NOT NULL,
+    created_by INTEGER,
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    accepted_at TEXT,
+    UNIQUE(team_id, email, role)
+);
+
+CREATE INDEX IF NOT EXISTS idx_invites_email_code ON invites(email, code);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    location TEXT,
+    start_at TEXT NOT NULL,
+    end_at TEXT NOT NULL,
+    is_locked INTEGER NOT NULL DEFAULT 0,
+    auto_lock_minutes INTEGER,
+    created_by INTEGER,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessions_team_start ON sessions(team_id, start_at);
+
+CREATE TABLE IF NOT EXISTS rsvps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    profile_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    note TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE(session_id, profile_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rsvps_session ON rsvps(session_id);
+
+CREATE INDEX IF NOT EXISTS idx_rsvps_profile ON rsvps(profile_id);
+
+CREATE TABLE IF NOT EXISTS activity_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id INTEGER NOT NULL,
+    profile_id INTEGER,
+    action TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    entity_id INTEGER,
+    payload TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_logs_team ON activity_logs(team_id, created_at DESC);
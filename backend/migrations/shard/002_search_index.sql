@@ -0,0 +1,47 @@
+-- Search indexes for the team-scoped tables in a shard; profiles_fts stays
+-- in the core database. Same layout and triggers as core migration 006.
+CREATE VIRTUAL TABLE IF NOT EXISTS invites_fts USING fts5(
+    team_id, email,
+    content='invites', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS invites_fts_insert AFTER INSERT ON invites BEGIN
+    INSERT INTO invites_fts(rowid, team_id, email) VALUES (new.id, new.team_id, new.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS invites_fts_delete AFTER DELETE ON invites BEGIN
+    INSERT INTO invites_fts(invites_fts, rowid, team_id, email) VALUES ('delete', old.id, old.team_id, old.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS invites_fts_update AFTER UPDATE OF team_id, email ON invites BEGIN
+    INSERT INTO invites_fts(invites_fts, rowid, team_id, email) VALUES ('delete', old.id, old.team_id, old.email);
+    INSERT INTO invites_fts(rowid, team_id, email) VALUES (new.id, new.team_id, new.email);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+    team_id, title, location, description,
+    content='sessions', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions BEGIN
+    INSERT INTO sessions_fts(rowid, team_id, title, location, description)
+    VALUES (new.id, new.team_id, new.title, new.location, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_delete AFTER DELETE ON sessions BEGIN
+    INSERT INTO sessions_fts(sessions_fts, rowid, team_id, title, location, description)
+    VALUES ('delete', old.id, old.team_id, old.title, old.location, old.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sessions_fts_update AFTER UPDATE OF team_id, title, location, description ON sessions BEGIN
+    INSERT INTO sessions_fts(sessions_fts, rowid, team_id, title, location, description)
+    VALUES ('delete', old.id, old.team_id, old.title, old.location, old.description);
+    INSERT INTO sessions_fts(rowid, team_id, title, location, description)
+    VALUES (new.id, new.team_id, new.title, new.location, new.description);
+END;
+
+-- Index rows that existed before this migration.
+INSERT INTO invites_fts(invites_fts) VALUES ('rebuild');
+INSERT INTO sessions_fts(sessions_fts) VALUES ('rebuild');
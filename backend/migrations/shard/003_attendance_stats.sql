@@ -0,0 +1,20 @@
+-- Same tables as core migration 007, without the references to core tables.
+CREATE TABLE IF NOT EXISTS attendance_stats (
+    team_id INTEGER NOT NULL,
+    season INTEGER NOT NULL,
+    profile_id INTEGER NOT NULL,
+    yes_count INTEGER NOT NULL DEFAULT 0,
+    no_count INTEGER NOT NULL DEFAULT 0,
+    maybe_count INTEGER NOT NULL DEFAULT 0,
+    pending_count INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (team_id, season, profile_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS attendance_seasons (
+    team_id INTEGER NOT NULL,
+    season INTEGER NOT NULL,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (team_id, season)
+) WITHOUT ROWID;
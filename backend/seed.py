@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import argparse
 import os
+import random
 import sys
+import time
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
+from typing import Any
 
 BASE_DIR = Path(__file__).resolve().parent
 if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
-from app.db import current_timestamp, db
+from app.db import current_timestamp, db, serialize_payload
+from app.services.attendance import rebuild as rebuild_attendance
+from app.utils.time import format_iso8601
 
 TEAMS = [
     ("Titans", "TITANS_MANAGER_EMAIL"),
@@ -52,8 +59,155 @@ def ensure_manager(email: str, team_id: int) -> None:
         )
 
 
-def main() -> None:
+# Response mix observed for U8 training: most families answer yes, a few never answer.
+RSVP_DISTRIBUTION = (("yes", 0.64), ("no", 0.14), ("maybe", 0.08), ("pending", 0.03), (None, 0.11))
+RSVP_STATUSES = [status for status, _ in RSVP_DISTRIBUTION]
+RSVP_CUM_WEIGHTS = [sum(weight for _, weight in RSVP_DISTRIBUTION[: index + 1]) for index in range(len(RSVP_DISTRIBUTION))]
+SCALE_PREFIX = "Scale"
+
+
+# Every generated timestamp derives from this date, so a seed yields the same rows on any day.
+SCALE_ANCHOR = date(2025, 8, 1)
+
+
+def generate_scale_data(teams: int, players_per_team: int, seasons: int, sessions_per_week: int, seed: int, anchor: date = SCALE_ANCHOR) -> dict[str, int]:
+    # Ids start at 1, so the same arguments only reproduce the same dataset in an empty database.
+    if db.query("SELECT id FROM teams LIMIT 1") or db.query("SELECT id FROM profiles LIMIT 1") or (db.shard_dir and db.shard_team_ids()):
+        raise SystemExit("Scale data needs an empty database; use a fresh DATABASE_PATH (and DATABASE_SHARD_DIR)")
+    rng = random.Random(seed)
+    now = format_iso8601(datetime(anchor.year, anchor.month, anchor.day, tzinfo=timezone.utc))
+    first_season = anchor.year - seasons + 1
+    team_id = 1
+    profile_id = 1
+    session_id = 1
+
+    team_rows = []
+    profile_rows = []
+    member_rows = []
+    token_rows = []
+    rosters: dict[int, list[int]] = {}
+    for team_index in range(1, teams + 1):
+        current_team = team_id + team_index - 1
+        team_rows.append((current_team, f"{SCALE_PREFIX} Team {team_index:04d}", now, now))
+        roster = []
+        for slot in range(players_per_team + 3):
+            role = "manager" if slot == 0 else "coach" if slot < 3 else "player"
+            profile_rows.append((
+                profile_id,
+                f"{role}{profile_id:07d}@{SCALE_PREFIX.lower()}.example",
+                f"{role.title()} {profile_id}",
+                f"07{rng.randrange(10**8, 10**9)}",
+                f"Guardian {profile_id}" if role == "player" else None,
+                now,
+                now,
+            ))
+            member_rows.append((current_team, profile_id, role, now))
+            for _ in range(rng.choice((1, 1, 2))):
+                token_rows.append((profile_id, f"scale-{rng.getrandbits(128):032x}", now, now if rng.random() < 0.7 else None))
+            roster.append(profile_id)
+            profile_id += 1
+        rosters[current_team] = roster
+
+    team_scoped: dict[int, tuple[list, list, list]] = {}
+    weekdays = (1, 3, 5)[:max(1, sessions_per_week)]
+    for current_team, roster in rosters.items():
+        if db.shard_dir:
+            # Session ids are only unique per shard; sessions are always addressed with their team.
+            session_id = 1
+        session_rows, rsvp_rows, activity_rows = team_scoped[current_team] = ([], [], [])
+        manager_id = roster[0]
+        for season in range(first_season, first_season + seasons):
+            season_start = datetime(season, 9, 1, 17, 30, tzinfo=timezone.utc)
+            for week in range(36):
+                for weekday in weekdays:
+                    start = season_start + timedelta(weeks=week, days=weekday)
+                    start_at = format_iso8601(start)
+                    session_rows.append((
+                        session_id,
+                        current_team,
+                        f"Training week {week + 1}",
+                        None,
+                        rng.choice(("Main pitch", "Pitch 2", "Sports hall")),
+                        start_at,
+                        format_iso8601(start + timedelta(hours=1)),
+                        0,
+                        60,
+                        manager_id,
+                        start_at,
+                        start_at,
+                    ))
+                    activity_rows.append((current_team, manager_id, "created", "session", session_id, serialize_payload({"title": f"Training week {week + 1}"}), start_at))
+                    players = roster[3:]
+                    statuses = rng.choices(RSVP_STATUSES, cum_weights=RSVP_CUM_WEIGHTS, k=len(players))
+                    for member_id, status in zip(players, statuses):
+                        if status is None:
+                            continue
+                        rsvp_rows.append((session_id, member_id, status, "", start_at, start_at))
+                        if rng.random() < 0.1:
+                            activity_rows.append((current_team, member_id, "created", "rsvp", session_id, serialize_payload({"status": status, "profile_id": member_id}), start_at))
+                    session_id += 1
+
+    connection = db.connection
+    try:
+        connection.executemany("INSERT INTO teams(id, name, created_at, updated_at) VALUES (?, ?, ?, ?)", team_rows)
+        connection.executemany("INSERT INTO profiles(id, email, display_name, phone, guardian_name, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)", profile_rows)
+        connection.executemany("INSERT INTO team_members(team_id, profile_id, role, joined_at) VALUES (?, ?, ?, ?)", member_rows)
+        connection.executemany("INSERT INTO access_tokens(profile_id, token, issued_at, last_used_at) VALUES (?, ?, ?, ?)", token_rows)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    # In sharded mode each team's rows go to its own file, one transaction per shard.
+    writers: dict[int, Any] = {}
+    try:
+        for current_team, (session_rows, rsvp_rows, activity_rows) in team_scoped.items():
+            with db.use_team(current_team):
+                writer = db.writer
+            writers[id(writer)] = writer
+            writer.executemany(
+                "INSERT INTO sessions(id, team_id, title, description, location, start_at, end_at, is_locked, auto_lock_minutes, created_by, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                session_rows,
+            )
+            writer.executemany("INSERT INTO rsvps(session_id, profile_id, status, note, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)", rsvp_rows)
+            writer.executemany("INSERT INTO activity_logs(team_id, profile_id, action, entity_type, entity_id, payload, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", activity_rows)
+        for writer in writers.values():
+            writer.commit()
+    except Exception:
+        for writer in writers.values():
+            writer.rollback()
+        raise
+    # Bulk inserts bypass the RSVP routes, so attendance statistics are derived afterwards.
+    rebuild_attendance(list(team_scoped), updated_at=now)
+    counts = [sum(len(rows[index]) for rows in team_scoped.values()) for index in range(3)]
+    return {
+        "teams": len(team_rows),
+        "profiles": len(profile_rows),
+        "team_members": len(member_rows),
+        "access_tokens": len(token_rows),
+        "sessions": counts[0],
+        "rsvps": counts[1],
+        "activity_logs": counts[2],
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Seed the OTJ U8s database")
+    parser.add_argument("--scale", action="store_true", help="Bulk-load a synthetic production-sized dataset")
+    parser.add_argument("--teams", type=int, default=400, help="Synthetic teams to create with --scale")
+    parser.add_argument("--players-per-team", type=int, default=12, help="Players per synthetic team")
+    parser.add_argument("--seasons", type=int, default=3, help="Seasons of weekly sessions to generate")
+    parser.add_argument("--sessions-per-week", type=int, default=2, choices=(1, 2, 3), help="Training sessions per week")
+    parser.add_argument("--seed", type=int, default=8, help="Random seed for deterministic output")
+    parser.add_argument("--anchor", type=date.fromisoformat, default=SCALE_ANCHOR, help="Date the synthetic data is generated as of (YYYY-MM-DD); its year is the latest season")
+    args = parser.parse_args(argv)
     db.migrate()
+    if args.scale:
+        # Loaded before the named teams, which need an empty database to get the same ids every run.
+        started = time.monotonic()
+        counts = generate_scale_data(args.teams, args.players_per_team, args.seasons, args.sessions_per_week, args.seed, args.anchor)
+        total = sum(counts.values())
+        summary = ", ".join(f"{table}={count}" for table, count in counts.items())
+        print(f"Scale data loaded: {total} rows in {time.monotonic() - started:.1f}s ({summary})")
     for team_name, env_key in TEAMS:
         team_id = ensure_team(team_name)
         ensure_manager(os.getenv(env_key, ""), team_id)